@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de throughput da EloquaInterface contra o MockEloquaServer, sem acesso à rede.
+
+Cada cenário roda num processo separado, para que o pico de memória (RSS) seja medido isoladamente.
+No linux o pico vem de VmHWM, que pertence ao processo do cenário; ru_maxrss herdaria o pico do processo
+pai, onde roda o servidor.
+
+Uso:
+    python benchmarks/benchmark.py --rows 500000 --latency 0.01
+    python benchmarks/benchmark.py --scenario get_data_parallel --workers 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import queue as queue_module
+import multiprocessing
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+from eloqua.eloquainterface import EloquaInterface
+from eloqua.mockserver import MockEloquaServer
+
+
+def _interface(login_url,args):
+    eloqua = EloquaInterface("mock","user","password",pool_size = max(10,args.workers),poll_initial_delay = 0.1)
+    eloqua.login_url = login_url
+    return eloqua
+
+
+def _get_data(eloqua,args,workers):
+    bulk_api_url = eloqua.get_bulk_url()
+    data_uri = eloqua._start_sync(bulk_api_url,eloqua.build_click(bulk_api_url))
+    return len(eloqua.get_data(bulk_api_url,data_uri,workers = workers))
+
+
+def bench_get_data(eloqua,args):
+    return _get_data(eloqua,args,1)
+
+
+def bench_get_data_parallel(eloqua,args):
+    return _get_data(eloqua,args,args.workers)
+
+
+def bench_iter_data(eloqua,args):
+    return sum(1 for _ in eloqua.iter_click_data())
+
+
+def bench_get_campaigns(eloqua,args):
+    return len(eloqua.get_campaigns())
+
+
+def bench_get_campaigns_parallel(eloqua,args):
+    return len(eloqua.get_campaigns(page_size = 1000,workers = args.workers))
+
+
+def bench_get_click_data(eloqua,args):
+    return len(eloqua.get_click_data())
+
+
+def bench_get_open_data(eloqua,args):
+    return len(eloqua.get_open_data())
+
+
+def bench_get_sent_data(eloqua,args):
+    return len(eloqua.get_sent_data())
+
+
+def bench_get_bounce_data(eloqua,args):
+    return len(eloqua.get_bounce_data())
+
+
+def bench_get_activities(eloqua,args):
+    return sum(len(rows) for rows in eloqua.get_activities(page_workers = args.workers).values())
+
+
+SCENARIOS = {name[len("bench_"):]: function for name,function in sorted(globals().items()) if name.startswith("bench_")}
+
+
+def _peak_rss_mb():
+    """Função que devolve o pico de memória residente deste processo, em MB
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])/1024
+    except OSError:
+        pass
+    # ru_maxrss é em KB no linux e em bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak/1024/1024 if sys.platform == "darwin" else peak/1024
+
+
+def _run_scenario(name,login_url,args,queue):
+    eloqua = _interface(login_url,args)
+    start = time.perf_counter()
+    rows = SCENARIOS[name](eloqua,args)
+    elapsed = time.perf_counter() - start
+    eloqua.close()
+    queue.put({"rows": rows,"seconds": elapsed,"peak_rss_mb": _peak_rss_mb(),"counters": eloqua.scheduler.counters})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da EloquaInterface contra um servidor Eloqua local")
+    parser.add_argument("--rows",type=int,default=200000,help="linhas por exportação")
+    parser.add_argument("--campaigns",type=int,default=5000,help="número de campanhas")
+    parser.add_argument("--latency",type=float,default=0.005,help="latência por requisição, em segundos")
+    parser.add_argument("--sync-duration",type=float,default=0.5,help="duração das sincronizações, em segundos")
+    parser.add_argument("--error-rate",type=float,default=0,help="fração de requisições com erro 429/503")
+    parser.add_argument("--workers",type=int,default=4,help="workers dos cenários paralelos")
+    parser.add_argument("--scenario",action="append",choices=sorted(SCENARIOS),help="cenário a rodar (padrão: todos)")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or sorted(SCENARIOS)
+    context = multiprocessing.get_context("spawn")
+    print("{:<26} {:>10} {:>9} {:>12} {:>10} {:>9} {:>8}".format(
+        "cenario","linhas","segundos","linhas/s","pico MB","reqs","retries"))
+    for name in scenarios:
+        with MockEloquaServer(rows = args.rows,campaigns = args.campaigns,sync_duration = args.sync_duration,
+                              latency = args.latency,error_rate = args.error_rate) as server:
+            queue = context.Queue()
+            process = context.Process(target=_run_scenario,args=(name,server.login_url,args,queue))
+            process.start()
+            result = None
+            while result is None and (process.is_alive() or not queue.empty()):
+                try:
+                    result = queue.get(timeout=1)
+                except queue_module.Empty:
+                    pass
+            process.join()
+            if result is None:
+                print("{:<26} falhou (codigo {})".format(name,process.exitcode))
+                continue
+            counters = result["counters"]
+            print("{:<26} {:>10} {:>9.2f} {:>12.0f} {:>10.1f} {:>9} {:>8}".format(
+                name,result["rows"],result["seconds"],result["rows"]/result["seconds"] if result["seconds"] else 0,
+                result["peak_rss_mb"],counters["requests"],counters["retries"]))
+            print("    servidor: {}".format(server.request_counts))
+
+
+if __name__ == "__main__":
+    main()
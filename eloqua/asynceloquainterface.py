@@ -0,0 +1,778 @@
+# -*- coding: utf-8 -*-
+"""
+Interface assíncrona (asyncio) para o Eloqua, com a mesma superfície da EloquaInterface.
+Requer o pacote opcional aiohttp.
+"""
+
+import asyncio
+import json
+import time
+import logging
+from math import ceil
+from urllib.parse import quote
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .eloquainterface import EloquaInterface, SyncTimeoutException, _loads
+from .scheduler import EloquaRequestException
+
+
+def _sync_only(name):
+    """Função interna que cria o método que substitui, na AsyncEloquaInterface, um fluxo herdado que só
+    funciona com requisições síncronas. O erro é levantado antes de qualquer requisição ou corrotina ser criada
+    """
+    def method(self,*args,**kwargs):
+        raise TypeError("{} não está disponível na AsyncEloquaInterface; use a EloquaInterface".format(name))
+    method.__name__ = name
+    method.__doc__ = "Não disponível na AsyncEloquaInterface (levanta TypeError); use EloquaInterface.{}".format(name)
+    return method
+
+
+class AsyncEloquaInterface(EloquaInterface):
+    """Interface assíncrona para o Eloqua.
+
+    Os métodos que fazem requisições (req, get_discovery, get_bulk_url, get_standard_url, build_*,
+    syc_data, check_data, get_data, get_campaigns e get_*_data) são corrotinas e devem ser aguardados
+    com await. A montagem das exportações e dos filtros é herdada da EloquaInterface. Os demais fluxos que
+    fazem requisições (exportações incrementais, por janelas, colunares e para arquivos, leitura em streaming
+    e catálogo de campanhas) são exclusivos da EloquaInterface e levantam TypeError aqui.
+    """
+
+    get_campaign_catalog = _sync_only("get_campaign_catalog")
+    iter_data_stream = _sync_only("iter_data_stream")
+    iter_incremental_data = _sync_only("iter_incremental_data")
+    get_incremental_data = _sync_only("get_incremental_data")
+    get_sharded_data = _sync_only("get_sharded_data")
+    get_activity_columns = _sync_only("get_activity_columns")
+    export_to_sink = _sync_only("export_to_sink")
+    export_activity = _sync_only("export_activity")
+    export_activity_resumable = _sync_only("export_activity_resumable")
+
+    def __init__(self, site_name, user_name,password,pool_size = 10,discovery_ttl = 3600,discovery_cache_path = None,
+                 poll_initial_delay = 1,poll_max_delay = 30,poll_jitter = 0.1,poll_timeout = None,
+                 export_cache_path = None,state_path = None,scheduler = None,metrics = None):
+        """Construtor para a interface assíncrona do eloqua
+
+            Parameters
+            ----------
+            site_name : str
+               endereço do site do usuário
+            user_name : str
+               usuário do Eloqua
+            password : str
+                senha para o eloqua
+            pool_size : int
+                número máximo de conexões abertas pela sessão. O padrão é 10
+            discovery_ttl : int
+                tempo, em segundos, em que a resposta de login.eloqua.com/id é reutilizada. O padrão é 3600
+            discovery_cache_path : str
+                caminho opcional de um arquivo json onde a resposta da descoberta é persistida por site
+            poll_initial_delay, poll_max_delay, poll_jitter, poll_timeout : float
+                configuração do polling das sincronizações, como na EloquaInterface
+            export_cache_path : str
+                caminho opcional do arquivo json com as definições de exportação reutilizáveis
+            state_path : str
+                caminho opcional do arquivo json com o estado local (marcas d'água) deste site
+            scheduler : RequestScheduler
+                agendador com limite de taxa, concorrência e novas tentativas. O padrão é None (um agendador próprio)
+            metrics : Metrics
+                métricas por fase das requisições. O padrão é None (métricas próprias)
+
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncEloquaInterface requer o pacote aiohttp (pip install aiohttp)")
+        super().__init__(site_name,user_name,password,pool_size = pool_size,
+                         discovery_ttl = discovery_ttl,discovery_cache_path = discovery_cache_path,
+                         poll_initial_delay = poll_initial_delay,poll_max_delay = poll_max_delay,
+                         poll_jitter = poll_jitter,poll_timeout = poll_timeout,
+                         export_cache_path = export_cache_path,state_path = state_path,scheduler = scheduler,
+                         metrics = metrics)
+        # o aiohttp só aceita headers em texto
+        self._headers = {key: value.decode('utf-8') if isinstance(value,bytes) else value
+                         for key,value in self._headers.items()}
+        self._async_discovery_lock = None
+        self._async_semaphore = None
+
+    def _build_session(self):
+        """Método interno para criar a sessão http. A sessão do aiohttp precisa de um event loop
+        em execução, então ela é criada somente na primeira requisição
+
+            Returns
+            -------
+            aiohttp.ClientSession
+                sessão compartilhada por todas as requisições desta interface, ou None fora de um event loop
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        connector = aiohttp.TCPConnector(limit=self.pool_size)
+        return aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        """Método para fechar a sessão http e liberar as conexões e os índices de deduplicação abertos
+        """
+        if self.session is not None:
+            session = self.session
+            self.session = None
+            await session.close()
+        self._close_dedup_indexes()
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' com a AsyncEloquaInterface")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def req(self,url,method = 'get',data ={},phase = None):
+        """Método para fazer uma requisição http
+        passando pelo scheduler, que aplica o limite de taxa e de concorrência e repete falhas temporárias.
+        Levanta EloquaRequestException se o Eloqua devolver um erro http depois das novas tentativas
+
+            Parameters
+            ----------
+            url : str
+               endereço do site a se fazer a requisição
+            method : str
+               O método http a ser utilizado(o padrão é 'get')
+            data : dict
+                dicionário de dados contendo os parâmetros que necessários para um método post. O padrão é um dicionário vazio
+            phase : str
+                fase usada nas métricas (discover, build, sync, poll, download ou campaigns). O padrão é None
+             Returns
+            -------
+            dict
+                Dicionário com a resposta do servidor
+        """
+        if self.session is None:
+            self.session = self._build_session()
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(self.scheduler.max_concurrency)
+        scheduler = self.scheduler
+        body = json.dumps(data) if method != 'get' else None
+        attempt = 0
+        start = time.perf_counter()
+        while True:
+            wait_time = scheduler.reserve()
+            if wait_time > 0:
+                scheduler.count("wait_time",wait_time)
+                await asyncio.sleep(wait_time)
+            status = None
+            retry_after = None
+            async with self._async_semaphore:
+                scheduler.count("requests")
+                try:
+                    if method == 'get':
+                        request = self.session.get(url, headers=self._headers)
+                    else:
+                        request = self.session.post(url, headers=self._headers,data = body)
+                    async with request as r:
+                        content = await r.read()
+                        # o status só vale depois do corpo lido, para que uma queda no meio dele seja repetida
+                        status = r.status
+                        retry_after = r.headers.get("Retry-After")
+                except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as exc:
+                    scheduler.count("connection_errors")
+                    if not scheduler.should_retry(method,attempt):
+                        scheduler.count("failures")
+                        self.metrics.record_request(phase,method,url,None,time.perf_counter() - start)
+                        raise
+                    logging.warning("Falha de conexao em %s (tentativa %s): %s",url,attempt+1,exc)
+            if status is not None:
+                if status < 400:
+                    self.metrics.record_request(phase,method,url,status,time.perf_counter() - start,len(content))
+                    start = time.perf_counter()
+                    response = _loads(content)
+                    self.metrics.record_decode(phase,time.perf_counter() - start)
+                    return response
+                if status in scheduler.retry_statuses:
+                    scheduler.count_status(status)
+                if not scheduler.should_retry(method,attempt,status):
+                    scheduler.count("failures")
+                    self.metrics.record_request(phase,method,url,status,time.perf_counter() - start,len(content))
+                    raise EloquaRequestException(status,url,content.decode('utf-8',errors='replace'))
+                logging.warning("Status %s em %s (tentativa %s)",status,url,attempt+1)
+            delay = scheduler.retry_delay(attempt,retry_after)
+            scheduler.count("retries")
+            self.metrics.record_retry(phase,status)
+            scheduler.count("wait_time",delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_discovery(self,refresh = False):
+        """Método para adquirir a resposta de login.eloqua.com/id, reutilizando-a enquanto o ttl for válido
+
+            Parameters
+            ----------
+            refresh : bool
+                força uma nova requisição, ignorando os caches. O padrão é False
+            Returns
+            -------
+            dict
+                dicionário com a resposta de login.eloqua.com/id
+        """
+        if self._async_discovery_lock is None:
+            self._async_discovery_lock = asyncio.Lock()
+        async with self._async_discovery_lock:
+            if not refresh:
+                if self._discovery is not None and time.time() - self._discovery_time <= self.discovery_ttl:
+                    return self._discovery
+                cached = self._read_discovery_cache()
+                if cached is not None:
+                    self._discovery = cached
+                    return cached
+            response = await self.req(self.login_url,phase = 'discover')
+            if isinstance(response, dict) and 'urls' in response:
+                self._discovery = response
+                self._discovery_time = time.time()
+                self._write_discovery_cache(response)
+            return response
+
+    async def get_bulk_url(self):
+        """Método para adquirir o url para a api bulk. Erros da requisição são propagados, e uma resposta
+        sem o endereço gera UserPasswordException
+
+            Returns
+            -------
+            str
+                string contendo o endereço url da api bulk
+        """
+        return self._api_url(await self.get_discovery(),'bulk')
+
+    async def get_standard_url(self):
+        """Método para adquirir o url para a api padrão 2.0. Erros da requisição são propagados, e uma resposta
+        sem o endereço gera UserPasswordException
+
+            Returns
+            -------
+            str
+                string contendo o endereço url da api padrão 2.0
+        """
+        return self._api_url(await self.get_discovery(),'standard')
+
+    async def get_campaigns(self,page_size = 500,workers = 1,updated_since = None):
+        """Método para adquirir todas as campanhas do eloqua. Usamos a versão 2.0 da api
+
+            Parameters
+            ----------
+            page_size : int
+                número de campanhas por página, limitado a max_campaign_page_size. O padrão é 500
+            workers : int
+                número de páginas buscadas ao mesmo tempo após a primeira. O padrão é 1 (sequencial)
+            updated_since : str
+                se informado, busca somente as campanhas com updatedAt maior ou igual a este valor. O padrão é None
+            Returns
+            -------
+            list
+                lista com todas as campanhas, na ordem das páginas
+        """
+        std_url = await self.get_standard_url()
+        page_size = min(page_size,self.max_campaign_page_size)
+        search = "&search=" + quote("updatedAt>='{}'".format(updated_since)) if updated_since is not None else ""
+        campaign_url = std_url + "assets/campaigns?count={}&page={}".format(page_size,1) + search
+        root_response = await self.req(campaign_url,phase = 'campaigns')
+        total = root_response["total"]
+        logging.debug("Total de campanhas: %s",total)
+        campaigns = list(root_response["elements"])
+        pages = int(ceil(total/page_size))
+        semaphore = asyncio.Semaphore(max(workers,1))
+
+        async def fetch(page):
+            async with semaphore:
+                campaign_url = std_url + "assets/campaigns?count={}&page={}".format(page_size,page) + search
+                return (await self.req(campaign_url,phase = 'campaigns'))["elements"]
+
+        # gather devolve os resultados na ordem das páginas
+        for elements in await asyncio.gather(*[fetch(page) for page in range(2,pages+1)]):
+            campaigns.extend(elements)
+        return campaigns
+
+    async def check_data(self,url,data_uri):
+        """Método para verificar o status da api para exportação de dados
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+
+            Returns
+            -------
+            dict
+                dicionário de resposta da requisição
+        """
+        return await self.req(url+data_uri,method='get',phase = 'poll')
+
+    async def get_sync_log(self,url):
+        """Método para adquirir o log de uma sincronização, registrando-o no logging
+
+            Parameters
+            ----------
+            url : str
+                url da sincronização
+
+            Returns
+            -------
+            dict
+                dicionário de resposta com os itens do log
+        """
+        log_response = await self.req(url+'/logs',method='get',phase = 'poll')
+        logging.error("Log da sincronizacao %s: %s",url,log_response)
+        return log_response
+
+    async def _check_sync_status(self,url,data_uri,check_response):
+        """Método interno que interpreta a resposta de status de uma sincronização
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri da sincronização
+            check_response : dict
+                resposta de check_data
+            Returns
+            -------
+            bool
+                True se a sincronização terminou com sucesso
+        """
+        status = check_response["status"]
+        logging.debug("Status da syncronizacao %s: %s",data_uri,status)
+        if status == 'error':
+            logging.error("Erro no sync: {}".format(check_response))
+            await self.get_sync_log(url+data_uri)
+            raise Exception("Erro na sicronização")
+        return status == "success"
+
+    async def wait_syncs(self,url,data_uris):
+        """Gerador assíncrono que acompanha várias sincronizações num único loop de polling,
+        devolvendo cada uma assim que termina
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uris : list
+                lista de uris das sincronizações
+
+            Yields
+            -------
+            tuple
+                (data_uri, resposta de status) de cada sincronização concluída
+        """
+        pending = list(data_uris)
+        start = time.time()
+        delay = self.poll_initial_delay
+        while pending:
+            responses = await asyncio.gather(*[self.check_data(url,data_uri) for data_uri in pending])
+            still_pending = []
+            for data_uri,check_response in zip(pending,responses):
+                if await self._check_sync_status(url,data_uri,check_response):
+                    self.metrics.record_sync(data_uri,check_response,time.time() - start)
+                    yield data_uri,check_response
+                else:
+                    still_pending.append(data_uri)
+            pending = still_pending
+            if not pending:
+                return
+            sleep_time = self._poll_delay(delay)
+            if self.poll_timeout is not None and time.time() - start + sleep_time > self.poll_timeout:
+                raise SyncTimeoutException("Sincronizações não concluídas em {}s: {}".format(self.poll_timeout,pending))
+            await asyncio.sleep(sleep_time)
+            delay = min(delay*2,self.poll_max_delay)
+
+    async def _wait_sync(self,url,data_uri):
+        """Método interno que aguarda a sincronização dos dados terminar, sem bloquear o event loop
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+
+            Returns
+            -------
+            dict
+                dicionário com a última resposta de status da sincronização
+        """
+        async for _,check_response in self.wait_syncs(url,[data_uri]):
+            pass
+        return check_response
+
+    async def _fetch_page(self,url,data_uri,offset):
+        """Método interno para buscar uma página dos dados exportados
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            offset : int
+                posição da primeira linha da página
+
+            Returns
+            -------
+            dict
+                dicionário de resposta da requisição, contendo items, hasMore e totalResults
+        """
+        get_data_url = url+data_uri+"/data?limit={}&offset={}".format(self.page_limit,offset)
+        get_data_response = await self.req(get_data_url,method='get',phase = 'download')
+        self.metrics.record_rows('download',get_data_response["count"])
+        logging.debug("Resposta: offset: %s, count: %s, hasMore: %s",offset,get_data_response["count"],get_data_response["hasMore"])
+        return get_data_response
+
+    async def iter_pages(self,url,data_uri,workers = 1,wait = True):
+        """Gerador assíncrono que devolve os dados exportados página a página, na ordem dos offsets
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            workers : int
+                número de páginas baixadas ao mesmo tempo após a primeira. O padrão é 1 (sequencial)
+            wait : bool
+                aguarda a sincronização terminar antes do download; use False se o status success já foi visto. O padrão é True
+
+            Yields
+            -------
+            list
+                lista com as linhas de uma página
+        """
+        if wait:
+            await self._wait_sync(url,data_uri)
+        get_data_response = await self._fetch_page(url,data_uri,0)
+        if get_data_response["totalResults"] <= 0:
+            return
+        yield get_data_response["items"]
+        if not get_data_response["hasMore"]:
+            return
+        offsets = list(range(self.page_limit,get_data_response["totalResults"],self.page_limit))
+        # buscamos os offsets em lotes de workers páginas, mantendo a ordem
+        step = max(workers,1)
+        for i in range(0,len(offsets),step):
+            responses = await asyncio.gather(*[self._fetch_page(url,data_uri,offset) for offset in offsets[i:i+step]])
+            for response in responses:
+                yield response["items"]
+
+    async def iter_data(self,url,data_uri,workers = 1):
+        """Gerador assíncrono que devolve os dados exportados linha a linha
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1 (sequencial)
+
+            Yields
+            -------
+            dict
+                uma linha dos dados exportados
+        """
+        async for page in self.iter_pages(url,data_uri,workers = workers):
+            for row in page:
+                yield row
+
+    async def get_data(self,url,data_uri,workers = 1,wait = True):
+        """Método para adquirir os dados necessários
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1 (sequencial)
+            wait : bool
+                aguarda a sincronização terminar antes do download; use False se o status success já foi visto. O padrão é True
+
+            Returns
+            -------
+            list
+                lista com todos os dados adquiridos
+        """
+        data = []
+        async for page in self.iter_pages(url,data_uri,workers = workers,wait = wait):
+            data.extend(page)
+        return data
+
+    async def syc_data(self,url,export_url):
+        """Método para sincronizar os dados após a criação da api de dados expecíficas
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            export_url : str
+                uri do dado a ser exportado
+
+            Returns
+            -------
+            dict
+                dicionário contento a resposta da requisição
+        """
+        return await self.req(url + "syncs",data = {"syncedInstanceUri" : export_url},method= 'post',phase = 'sync')
+
+    async def build_export(self,bulk_api_url,data,reuse = True,cache = True):
+        """Método para construir a api de dados a ser exportada, reutilizando definições iguais já criadas.
+        Os métodos build_click, build_open, build_sent e build_bounce herdados devolvem esta corrotina
+        e também devem ser aguardados
+
+            Parameters
+            ----------
+            bulk_api_url : str
+                url da bulk api para este usuário
+            data : dict
+                dicionário contento os dados necessários para a cosntrução da api
+            reuse : bool
+                se False, sempre cria uma nova definição. O padrão é True
+            cache : bool
+                se False, a definição criada não é guardada para reutilização. O padrão é True
+            Returns
+            -------
+            dict
+                dicionário contento a resposta da requisição
+        """
+        if reuse:
+            cached = self._cached_export(data)
+            if cached is not None:
+                with self._export_lock:
+                    self._reused_exports[str(cached["uri"])] = data
+                return cached
+        response = await self.req(bulk_api_url+"activities/exports",method = 'post',data = data,phase = 'build')
+        if cache:
+            self._store_export(data,response)
+        return response
+
+    async def _start_sync(self,bulk_api_url,bulk_response):
+        """Método interno para sincronizar uma exportação recém construída
+
+            Parameters
+            ----------
+            bulk_api_url : str
+                url da bulk api para este usuário
+            bulk_response : dict
+                resposta da construção da exportação
+            Returns
+            -------
+            str
+                uri da sincronização, usada para buscar os dados
+        """
+        build_uri = str(bulk_response["uri"])
+        logging.debug("Endereço de exportacao: %s",build_uri)
+        logging.info("Iniciando a sincronizacao da API")
+        try:
+            syc_response = await self.syc_data(bulk_api_url,build_uri)
+        except EloquaRequestException as error:
+            data = self._stale_export(bulk_response,error)
+            if data is None:
+                raise
+            bulk_response = await self.build_export(bulk_api_url,data,reuse = False)
+            syc_response = await self.syc_data(bulk_api_url,str(bulk_response["uri"]))
+        return syc_response["uri"]
+
+    async def get_activities(self,types = ("click","open","sent","bounce"),extra_filter = None,workers = 1):
+        """Método para buscar vários tipos de atividade numa única chamada. Todas as exportações são construídas
+        e sincronizadas logo no início, e cada uma é baixada assim que sua sincronização termina
+
+            Parameters
+            ----------
+            types : list
+                tipos de atividade ('click', 'open', 'sent' e/ou 'bounce'). O padrão são os quatro
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo dentro de cada exportação. O padrão é 1
+            Returns
+            -------
+            dict
+                dicionário com o tipo de atividade como chave e a lista de dados como valor
+        """
+        types = list(types)
+        if not types:
+            return {}
+        bulk_api_url = await self.get_bulk_url()
+
+        async def start(activity_type):
+            return await self._start_sync(bulk_api_url,await self.build_activity(bulk_api_url,activity_type,extra_filter))
+
+        data_uris = await asyncio.gather(*[start(activity_type) for activity_type in types])
+        types_by_uri = dict(zip(data_uris,types))
+        downloads = {}
+        async for data_uri,_ in self.wait_syncs(bulk_api_url,data_uris):
+            downloads[types_by_uri[data_uri]] = asyncio.ensure_future(self.get_data(bulk_api_url,data_uri,workers = workers,wait = False))
+        return {activity_type: await downloads[activity_type] for activity_type in types}
+
+    async def get_click_data(self,extra_filter = None,workers = 1):
+        """Método para buscar todos os dados de clique
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Returns
+            -------
+            list
+                lista contendo todos os dados de clique
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_click(bulk_api_url,extra_filter))
+        return await self.get_data(bulk_api_url,data_uri,workers = workers)
+
+    async def get_open_data(self,extra_filter = None,workers = 1):
+        """Método para buscar todos os dados de emails abertos
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Returns
+            -------
+            list
+                lista contendo todos os dados de emails abertos
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_open(bulk_api_url,extra_filter))
+        return await self.get_data(bulk_api_url,data_uri,workers = workers)
+
+    async def get_bounce_data(self,extra_filter = None,workers = 1):
+        """Método para buscar todos os dados de bounce
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Returns
+            -------
+            list
+                lista contendo todos os dados de bounce
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_bounce(bulk_api_url,extra_filter))
+        return await self.get_data(bulk_api_url,data_uri,workers = workers)
+
+    async def get_sent_data(self,extra_filter = None,workers = 1):
+        """Método para buscar todos os dados de emails enviados
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Returns
+            -------
+            list
+                lista contendo todos os dados de emails enviados
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_sent(bulk_api_url,extra_filter = extra_filter))
+        return await self.get_data(bulk_api_url,data_uri,workers = workers)
+
+    async def iter_click_data(self,extra_filter = None,workers = 1):
+        """Gerador assíncrono que devolve os dados de clique linha a linha
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Yields
+            -------
+            dict
+                uma linha dos dados de clique
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_click(bulk_api_url,extra_filter))
+        async for row in self.iter_data(bulk_api_url,data_uri,workers = workers):
+            yield row
+
+    async def iter_open_data(self,extra_filter = None,workers = 1):
+        """Gerador assíncrono que devolve os dados de emails abertos linha a linha
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Yields
+            -------
+            dict
+                uma linha dos dados de emails abertos
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_open(bulk_api_url,extra_filter))
+        async for row in self.iter_data(bulk_api_url,data_uri,workers = workers):
+            yield row
+
+    async def iter_bounce_data(self,extra_filter = None,workers = 1):
+        """Gerador assíncrono que devolve os dados de bounce linha a linha
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Yields
+            -------
+            dict
+                uma linha dos dados de bounce
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_bounce(bulk_api_url,extra_filter))
+        async for row in self.iter_data(bulk_api_url,data_uri,workers = workers):
+            yield row
+
+    async def iter_sent_data(self,extra_filter = None,workers = 1):
+        """Gerador assíncrono que devolve os dados de emails enviados linha a linha
+
+            Parameters
+            ----------
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave,
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado
+            workers : int
+                número de páginas baixadas ao mesmo tempo. O padrão é 1
+            Yields
+            -------
+            dict
+                uma linha dos dados de emails enviados
+        """
+        bulk_api_url = await self.get_bulk_url()
+        data_uri = await self._start_sync(bulk_api_url,await self.build_sent(bulk_api_url,extra_filter = extra_filter))
+        async for row in self.iter_data(bulk_api_url,data_uri,workers = workers):
+            yield row
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Catálogo de campanhas do Eloqua indexado por id e por nome, com snapshot em disco e atualização incremental
+pelo campo updatedAt, para enriquecer as atividades exportadas sem novas chamadas à api.
+"""
+
+import os
+import json
+import logging
+import threading
+
+
+class CampaignCatalog:
+    """Cópia local das campanhas de um site.
+
+    refresh() baixa somente as campanhas alteradas desde a última atualização (updatedAt) e grava o snapshot.
+    Campanhas apagadas no Eloqua só saem do catálogo numa atualização completa (refresh(full=True)).
+    Quando vários nomes se repetem, by_name devolve a campanha alterada mais recentemente.
+    """
+
+    def __init__(self,interface,path = None,fields = None):
+        """Construtor do catálogo
+
+            Parameters
+            ----------
+            interface : EloquaInterface
+                interface usada para buscar as campanhas
+            path : str
+                caminho opcional de um arquivo json onde o snapshot do catálogo é guardado por site.
+                O padrão é None (somente em memória)
+            fields : list
+                campos guardados de cada campanha, além de id, name e updatedAt. O padrão é None (todos)
+
+        """
+        self.interface = interface
+        self.path = path
+        self.fields = None if fields is None else set(fields) | {"id","name","updatedAt"}
+        self.updated_at = None
+        self._by_id = {}
+        self._by_name = {}
+        # valores já resolvidos por conjunto de campos, usados em enrich_page
+        self._joins = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            self._load()
+
+    def _load(self):
+        """Método interno que carrega o snapshot deste site, se existir
+        """
+        try:
+            with open(self.path,'r') as handle:
+                snapshot = json.load(handle).get(self.interface.site_name)
+        except (OSError, ValueError):
+            snapshot = None
+        if snapshot:
+            self.updated_at = snapshot["updated_at"]
+            self._merge(snapshot["campaigns"])
+
+    def _save(self):
+        """Método interno que grava o snapshot de forma atômica, preservando os outros sites do arquivo
+        """
+        try:
+            with open(self.path,'r') as handle:
+                content = json.load(handle)
+        except (OSError, ValueError):
+            content = {}
+        content[self.interface.site_name] = {"updated_at": self.updated_at,"campaigns": list(self._by_id.values())}
+        tmp_path = "{}.{}.tmp".format(self.path,os.getpid())
+        with open(tmp_path,'w') as handle:
+            json.dump(content,handle)
+        os.replace(tmp_path,self.path)
+
+    def _merge(self,campaigns):
+        """Método interno que incorpora campanhas novas ou alteradas aos índices
+        """
+        for campaign in campaigns:
+            if self.fields is not None:
+                campaign = {key: value for key,value in campaign.items() if key in self.fields}
+            old = self._by_id.get(campaign["id"])
+            self._by_id[campaign["id"]] = campaign
+            if old is not None and old.get("name") != campaign.get("name") and self._by_name.get(old.get("name")) == campaign["id"]:
+                # a campanha renomeada era a escolhida pelo nome antigo: passa para a mais recente que ainda o usa
+                self._reindex_name(old.get("name"))
+            current = self._by_id.get(self._by_name.get(campaign.get("name")))
+            if current is None or int(current.get("updatedAt") or 0) <= int(campaign.get("updatedAt") or 0):
+                self._by_name[campaign.get("name")] = campaign["id"]
+            if campaign.get("updatedAt") and (self.updated_at is None or int(campaign["updatedAt"]) > int(self.updated_at)):
+                self.updated_at = campaign["updatedAt"]
+        self._joins = {}
+
+    def _reindex_name(self,name):
+        """Método interno que aponta um nome para a campanha alterada mais recentemente que o usa, ou o remove
+        do índice se nenhuma campanha o usa mais
+        """
+        current = None
+        for campaign in self._by_id.values():
+            if campaign.get("name") == name and (current is None or int(current.get("updatedAt") or 0) <= int(campaign.get("updatedAt") or 0)):
+                current = campaign
+        if current is None:
+            self._by_name.pop(name,None)
+        else:
+            self._by_name[name] = current["id"]
+
+    def refresh(self,full = False,page_size = 1000,workers = 1):
+        """Método para atualizar o catálogo com as campanhas alteradas desde a última atualização
+
+            Parameters
+            ----------
+            full : bool
+                baixa todas as campanhas e descarta as que não existem mais. O padrão é False
+            page_size : int
+                número de campanhas por página. O padrão é 1000
+            workers : int
+                número de páginas buscadas em paralelo. O padrão é 1
+            Returns
+            -------
+            int
+                número de campanhas novas ou alteradas
+        """
+        with self._lock:
+            updated_since = None if full or not self._by_id else self.updated_at
+            campaigns = self.interface.get_campaigns(page_size = page_size,workers = workers,updated_since = updated_since)
+            if updated_since is None:
+                self._by_id = {}
+                self._by_name = {}
+                self.updated_at = None
+            self._merge(campaigns)
+            logging.info("Catalogo de campanhas atualizado: %s alteradas, %s no total",len(campaigns),len(self._by_id))
+            if self.path is not None:
+                self._save()
+            return len(campaigns)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self,campaign_id):
+        return str(campaign_id) in self._by_id
+
+    def get(self,campaign_id,default = None):
+        """Método para buscar uma campanha pelo id
+
+            Parameters
+            ----------
+            campaign_id : str ou int
+                id da campanha (CampaignId nas atividades)
+            default
+                valor devolvido se a campanha não estiver no catálogo. O padrão é None
+            Returns
+            -------
+            dict
+                campanha
+        """
+        return self._by_id.get(str(campaign_id),default)
+
+    def by_name(self,name,default = None):
+        """Método para buscar uma campanha pelo nome
+
+            Parameters
+            ----------
+            name : str
+                nome da campanha
+            default
+                valor devolvido se não houver campanha com este nome. O padrão é None
+            Returns
+            -------
+            dict
+                campanha
+        """
+        campaign_id = self._by_name.get(name)
+        return self._by_id[campaign_id] if campaign_id is not None else default
+
+    def _join(self,fields):
+        """Método interno que devolve, para cada id, a tupla com os valores dos campos, calculada uma vez
+        """
+        join = self._joins.get(fields)
+        if join is None:
+            join = {campaign_id: tuple(campaign.get(field) for field in fields)
+                    for campaign_id,campaign in self._by_id.items()}
+            self._joins[fields] = join
+        return join
+
+    def enrich_page(self,page,fields = ("name",),key = "CampaignId",prefix = "Campaign"):
+        """Método que acrescenta os campos da campanha a cada linha de uma página, sem requisições
+
+            Parameters
+            ----------
+            page : list
+                lista de dicionários, uma página da exportação
+            fields : tuple
+                campos da campanha a acrescentar. O padrão é ('name',)
+            key : str
+                campo das linhas com o id da campanha. O padrão é 'CampaignId'
+            prefix : str
+                prefixo dos novos campos, como em CampaignName. O padrão é 'Campaign'
+            Returns
+            -------
+            list
+                a mesma página, com os campos acrescentados (None se a campanha não estiver no catálogo)
+        """
+        fields = tuple(fields)
+        join = self._join(fields)
+        names = [prefix + field[:1].upper() + field[1:] for field in fields]
+        missing = (None,)*len(fields)
+        for row in page:
+            row.update(zip(names,join.get(row.get(key),missing)))
+        return page
+
+    def enrich_pages(self,pages,fields = ("name",),key = "CampaignId",prefix = "Campaign"):
+        """Gerador que aplica enrich_page a cada página de uma exportação, como as de iter_pages
+        """
+        for page in pages:
+            yield self.enrich_page(page,fields = fields,key = key,prefix = prefix)
+
+    def enrich_columns(self,columns,fields = ("name",),key = "CampaignId",prefix = "Campaign"):
+        """Método que acrescenta os campos da campanha a um resultado colunar (backend 'numpy' de
+        get_activity_columns). Cada id distinto é buscado uma única vez. Requer numpy
+
+            Parameters
+            ----------
+            columns : dict
+                dicionário de arrays, com os ids das campanhas como inteiros (-1 para vazio)
+            fields : tuple
+                campos da campanha a acrescentar. O padrão é ('name',)
+            key : str
+                coluna com o id da campanha. O padrão é 'CampaignId'
+            prefix : str
+                prefixo das novas colunas. O padrão é 'Campaign'
+            Returns
+            -------
+            dict
+                o mesmo dicionário, com as novas colunas
+        """
+        # importado aqui para que o numpy só seja carregado quando o formato colunar for usado
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("enrich_columns requer o pacote numpy (pip install numpy)")
+        fields = tuple(fields)
+        join = self._join(fields)
+        missing = (None,)*len(fields)
+        unique,inverse = np.unique(columns[key],return_inverse=True)
+        for position,field in enumerate(fields):
+            values = np.array([join.get(str(value),missing)[position] for value in unique.tolist()],dtype=object)
+            columns[prefix + field[:1].upper() + field[1:]] = values[inverse.reshape(-1)] if len(values) else values
+        return columns
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Conversão das páginas exportadas pela bulk api para formato colunar (NumPy, Arrow e Parquet).
+Requer os pacotes opcionais numpy e/ou pyarrow.
+"""
+
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# colunas das exportações de atividade que são identificadores numéricos
+INTEGER_COLUMNS = {"ActivityId", "ContactId", "AssetId", "CampaignId", "VisitorId", "DeploymentId"}
+# colunas das exportações de atividade que são datas
+DATETIME_COLUMNS = {"ActivityDate"}
+
+
+def _parse_int(value):
+    """Função interna que converte um identificador para inteiro, devolvendo None se estiver vazio
+    """
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _parse_datetime(value):
+    """Função interna que coloca a data no formato ISO 8601 aceito pelo numpy e pelo arrow
+    """
+    if value is None or value == "":
+        return None
+    return value.replace(" ", "T", 1)
+
+
+class ColumnarBuilder:
+    """Acumula páginas de linhas (dicionários) em colunas tipadas, página a página.
+
+    Cada página é convertida em um bloco de colunas assim que chega, então os dicionários da página podem
+    ser descartados em seguida. IDs viram inteiros e ActivityDate vira datetime64[ms] / timestamp[ms].
+    """
+
+    def __init__(self,columns = None,backend = 'numpy'):
+        """Construtor do acumulador colunar
+
+            Parameters
+            ----------
+            columns : list
+                nomes das colunas. O padrão é None (usa as chaves da primeira linha recebida)
+            backend : str
+                'numpy' para um dicionário de arrays NumPy, ou 'arrow' para uma pyarrow.Table. O padrão é 'numpy'
+
+        """
+        if backend == 'numpy' and np is None:
+            raise ImportError("O backend 'numpy' requer o pacote numpy (pip install numpy)")
+        if backend == 'arrow' and pa is None:
+            raise ImportError("O backend 'arrow' requer o pacote pyarrow (pip install pyarrow)")
+        if backend not in ('numpy','arrow'):
+            raise ValueError("Backend desconhecido: {}".format(backend))
+        self.backend = backend
+        self.columns = list(columns) if columns is not None else None
+        self.rows = 0
+        self._chunks = {}
+
+    def _numpy_column(self,name,values):
+        """Método interno que converte os valores de uma coluna de uma página em um array NumPy.
+        Identificadores vazios viram -1 e datas vazias viram NaT
+        """
+        if name in INTEGER_COLUMNS:
+            parsed = [_parse_int(value) for value in values]
+            return np.array([-1 if value is None else value for value in parsed],dtype=np.int64)
+        if name in DATETIME_COLUMNS:
+            return np.array([_parse_datetime(value) or 'NaT' for value in values],dtype='datetime64[ms]')
+        return np.array(values,dtype=object)
+
+    def _arrow_column(self,name,values):
+        """Método interno que converte os valores de uma coluna de uma página em um pyarrow.Array.
+        Valores vazios viram nulos
+        """
+        if name in INTEGER_COLUMNS:
+            return pa.array([_parse_int(value) for value in values],type=pa.int64())
+        if name in DATETIME_COLUMNS:
+            return pa.array([_parse_datetime(value) for value in values],type=pa.string()).cast(pa.timestamp('ms'))
+        return pa.array(values,type=pa.string())
+
+    def add_page(self,page):
+        """Método para converter uma página de linhas e acrescentá-la às colunas
+
+            Parameters
+            ----------
+            page : list
+                lista de dicionários, uma página da exportação
+        """
+        if not page:
+            return
+        if self.columns is None:
+            self.columns = list(page[0].keys())
+        convert = self._numpy_column if self.backend == 'numpy' else self._arrow_column
+        for name in self.columns:
+            values = [row.get(name) for row in page]
+            self._chunks.setdefault(name,[]).append(convert(name,values))
+        self.rows += len(page)
+
+    def result(self):
+        """Método para adquirir o resultado colunar
+
+            Returns
+            -------
+            dict ou pyarrow.Table
+                dicionário de arrays NumPy (backend 'numpy') ou pyarrow.Table (backend 'arrow')
+        """
+        columns = self.columns or []
+        if self.backend == 'numpy':
+            return {name: np.concatenate(self._chunks[name]) if name in self._chunks else np.array([],dtype=object)
+                    for name in columns}
+        return pa.table({name: pa.chunked_array(self._chunks.get(name,[]),type=self._arrow_type(name))
+                         for name in columns})
+
+    def _arrow_type(self,name):
+        """Método interno com o tipo arrow de uma coluna
+        """
+        if name in INTEGER_COLUMNS:
+            return pa.int64()
+        if name in DATETIME_COLUMNS:
+            return pa.timestamp('ms')
+        return pa.string()
+
+
+def to_columns(pages,columns = None,backend = 'numpy'):
+    """Função que converte um iterável de páginas em colunas tipadas, uma página por vez
+
+        Parameters
+        ----------
+        pages : iterable
+            iterável de páginas (listas de dicionários), por exemplo EloquaInterface.iter_pages
+        columns : list
+            nomes das colunas. O padrão é None (usa as chaves da primeira linha)
+        backend : str
+            'numpy' ou 'arrow'. O padrão é 'numpy'
+        Returns
+        -------
+        dict ou pyarrow.Table
+            dicionário de arrays NumPy ou pyarrow.Table
+    """
+    builder = ColumnarBuilder(columns = columns,backend = backend)
+    for page in pages:
+        builder.add_page(page)
+    return builder.result()
+
+
+def write_parquet(pages,path,columns = None):
+    """Função que grava um iterável de páginas diretamente num arquivo Parquet, um row group por página,
+    sem acumular a exportação em memória. A gravação é feita num arquivo temporário, que só substitui path
+    quando todas as páginas foram gravadas
+
+        Parameters
+        ----------
+        pages : iterable
+            iterável de páginas (listas de dicionários)
+        path : str
+            caminho do arquivo parquet
+        columns : list
+            nomes das colunas. O padrão é None (usa as chaves da primeira linha)
+        Returns
+        -------
+        int
+            número de linhas gravadas
+    """
+    if pq is None:
+        raise ImportError("write_parquet requer o pacote pyarrow (pip install pyarrow)")
+    tmp_path = "{}.{}.tmp".format(path,os.getpid())
+    writer = None
+    rows = 0
+    try:
+        for page in pages:
+            if not page:
+                continue
+            builder = ColumnarBuilder(columns = columns,backend = 'arrow')
+            builder.add_page(page)
+            table = builder.result()
+            columns = builder.columns
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path,table.schema)
+            writer.write_table(table)
+            rows += builder.rows
+    except BaseException:
+        # um download interrompido não pode deixar um arquivo parquet válido, mas incompleto
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path,path)
+    return rows
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de ActivityIds já exportados, para descartar atividades duplicadas (janelas sobrepostas, cargas
+refeitas, exportações incrementais mescladas) com memória limitada.
+
+Os IDs ficam num arquivo de inteiros de 64 bits ordenados, lido via mmap e consultado por busca binária.
+Os IDs novos ficam num conjunto em memória até buffer_size; depois são despejados, ordenados, num segundo
+arquivo ainda não confirmado. commit() incorpora tudo ao arquivo principal e discard() descarta, de modo que
+uma exportação que falhou não marca suas atividades como vistas. Um filtro de Bloom opcional evita a busca
+binária para a maioria dos IDs novos.
+"""
+
+import os
+import mmap
+import glob
+import math
+import struct
+import hashlib
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import count
+
+from .locks import lock_for
+
+
+# número de inteiros gravados de cada vez ao mesclar os arquivos
+_CHUNK = 65536
+# numera os arquivos de chaves não confirmadas das instâncias deste processo
+_spill_ids = count()
+
+
+def activity_key(value):
+    """Função que converte um ActivityId para o inteiro guardado no índice. IDs não numéricos viram um hash de 64 bits
+
+        Parameters
+        ----------
+        value : str ou int
+            ActivityId da linha
+        Returns
+        -------
+        int
+            chave do índice
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        digest = hashlib.blake2b(str(value).encode('utf-8'),digest_size=8).digest()
+        return int.from_bytes(digest,'little',signed=True)
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre chaves inteiras. Responde 'talvez presente' ou 'certamente ausente'.
+    """
+
+    # tamanho, número de hashes e número de chaves do arquivo do índice quando o filtro foi gravado
+    _header = struct.Struct("<QQQ")
+
+    def __init__(self,capacity,error_rate = 0.01):
+        """Construtor do filtro
+
+            Parameters
+            ----------
+            capacity : int
+                número de chaves esperado
+            error_rate : float
+                taxa de falsos positivos com capacity chaves. O padrão é 0.01
+
+        """
+        self.size = max(8,int(-capacity*math.log(error_rate)/(math.log(2)**2)))
+        self.hashes = max(1,round(self.size/capacity*math.log(2)))
+        self.bits = bytearray((self.size+7)//8)
+
+    def _positions(self,key):
+        # hash duplo a partir de uma única multiplicação de Fibonacci
+        h = (key*0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        return [(h1 + i*h2) % self.size for i in range(self.hashes)]
+
+    def add(self,key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self,key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def save(self,path,keys):
+        """Método para gravar o filtro em disco de forma atômica
+
+            Parameters
+            ----------
+            path : str
+                caminho do arquivo do filtro
+            keys : int
+                número de chaves do arquivo do índice que o filtro representa
+        """
+        tmp_path = "{}.{}.tmp".format(path,os.getpid())
+        with open(tmp_path,'wb') as handle:
+            handle.write(self._header.pack(self.size,self.hashes,keys))
+            handle.write(self.bits)
+        os.replace(tmp_path,path)
+
+    def load(self,path,keys):
+        """Método para carregar um filtro gravado com save
+
+            Parameters
+            ----------
+            path : str
+                caminho do arquivo do filtro
+            keys : int
+                número de chaves do arquivo do índice atual. Como o índice só cresce, um filtro gravado com
+                outro número de chaves está desatualizado
+            Returns
+            -------
+            bool
+                True se o arquivo existe, tem os mesmos parâmetros deste filtro e corresponde ao índice
+        """
+        try:
+            with open(path,'rb') as handle:
+                size,hashes,saved_keys = self._header.unpack(handle.read(self._header.size))
+                if (size,hashes,saved_keys) != (self.size,self.hashes,keys):
+                    return False
+                bits = handle.read()
+        except (OSError, struct.error):
+            return False
+        if len(bits) != len(self.bits):
+            return False
+        self.bits = bytearray(bits)
+        return True
+
+
+class _SortedFile:
+    """Arquivo de inteiros de 64 bits ordenados, aberto via mmap somente para leitura.
+    """
+
+    def __init__(self,path):
+        self.path = path
+        self._map = None
+        self.view = memoryview(b"").cast('q')
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path,'rb') as handle:
+                self._map = mmap.mmap(handle.fileno(),0,access=mmap.ACCESS_READ)
+            self.view = memoryview(self._map).cast('q')
+
+    def __len__(self):
+        return len(self.view)
+
+    def __contains__(self,key):
+        index = bisect_left(self.view,key)
+        return index < len(self.view) and self.view[index] == key
+
+    def close(self):
+        self.view.release()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _merge(base,values,path):
+    """Função interna que grava em path a união ordenada de base (um _SortedFile) com values, um iterável
+    ordenado de chaves. Os trechos de base entre duas chaves são copiados em bloco e as chaves que já estão
+    em base (gravadas por outra instância desde a abertura) são ignoradas.
+    """
+    tmp_path = "{}.{}.tmp".format(path,os.getpid())
+    view = base.view
+    with open(tmp_path,'wb') as handle:
+        start = 0
+        buffer = array('q')
+        for value in values:
+            index = bisect_left(view,value,start)
+            if index < len(view) and view[index] == value:
+                continue
+            if index > start:
+                handle.write(buffer.tobytes())
+                buffer = array('q')
+                handle.write(view[start:index])
+                start = index
+            buffer.append(value)
+            if len(buffer) >= _CHUNK:
+                handle.write(buffer.tobytes())
+                buffer = array('q')
+        handle.write(buffer.tobytes())
+        handle.write(view[start:])
+    return tmp_path
+
+
+class ActivityIndex:
+    """Índice persistente de ActivityIds de um site e tipo de atividade.
+
+    O uso de memória é limitado a buffer_size chaves pendentes (e ao filtro de Bloom, se houver); o restante
+    fica em disco. A instância é segura para uso por várias threads, e várias instâncias (inclusive em outros
+    processos) podem usar o mesmo path: cada uma despeja as suas chaves num arquivo próprio e os commits são
+    serializados por uma trava em path + '.lock'. Os commits de outras instâncias só são vistos depois do
+    próximo commit desta. O compartilhamento do path só funciona em POSIX: no Windows, o commit não consegue
+    substituir um arquivo do índice que outra instância mantém aberto via mmap.
+    """
+
+    def __init__(self,path,buffer_size = 1000000,bloom_capacity = None,bloom_error_rate = 0.01):
+        """Construtor do índice
+
+            Parameters
+            ----------
+            path : str
+                caminho do arquivo do índice. O filtro de Bloom (path + '.bloom'), a trava e as chaves não confirmadas
+                de cada instância ficam ao lado
+            buffer_size : int
+                número de chaves novas mantidas em memória antes de serem despejadas em disco. O padrão é 1000000
+            bloom_capacity : int
+                número de IDs esperado no índice; se informado, um filtro de Bloom é consultado antes da busca
+                binária. O padrão é None (sem filtro)
+            bloom_error_rate : float
+                taxa de falsos positivos do filtro de Bloom. O padrão é 0.01
+
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._remove_stale_spills()
+        spill_path = "{}.{}.{}.new".format(path,os.getpid(),next(_spill_ids))
+        # a trava do arquivo não confirmado fica com a instância enquanto ela estiver aberta, para que as
+        # outras saibam que ele não está abandonado
+        self._spill_lock = lock_for(spill_path)
+        self._spill_lock.acquire()
+        self._new = _SortedFile(spill_path)
+        self.bloom = None
+        if bloom_capacity:
+            self.bloom = BloomFilter(bloom_capacity,bloom_error_rate)
+        with lock_for(path):
+            self._base = _SortedFile(path)
+            if self.bloom is not None and not self.bloom.load(path + ".bloom",len(self._base)):
+                self._rebuild_bloom()
+                self.bloom.save(path + ".bloom",len(self._base))
+        # número de chaves do arquivo do índice refletidas no filtro de Bloom em memória
+        self._bloom_keys = len(self._base)
+
+    def _remove_stale_spills(self):
+        """Método interno que apaga as chaves não confirmadas deixadas por instâncias que já terminaram,
+        reconhecidas pela trava livre
+        """
+        for spill_path in glob.glob(glob.escape(self.path) + ".*.*.new"):
+            spill_lock = lock_for(spill_path)
+            if not spill_lock.acquire(blocking = False):
+                continue
+            try:
+                os.remove(spill_path)
+            except FileNotFoundError:
+                pass
+            finally:
+                # o arquivo de trava fica: apagá-lo enquanto outra instância espera por ele separaria as travas
+                spill_lock.release()
+
+    def _rebuild_bloom(self):
+        """Método interno que recria o filtro de Bloom a partir do arquivo do índice
+        """
+        self.bloom.bits = bytearray(len(self.bloom.bits))
+        for key in self._base.view:
+            self.bloom.add(key)
+
+    def __len__(self):
+        return len(self._base) + len(self._new) + len(self._pending)
+
+    def _contains(self,key):
+        """Método interno de consulta (deve ser chamado com o lock)
+        """
+        if key in self._pending:
+            return True
+        if self.bloom is not None and key not in self.bloom:
+            return False
+        return key in self._base or key in self._new
+
+    def __contains__(self,key):
+        with self._lock:
+            return self._contains(activity_key(key))
+
+    def _add(self,key):
+        """Método interno que adiciona uma chave ausente (deve ser chamado com o lock)
+        """
+        self._pending.add(key)
+        if self.bloom is not None:
+            self.bloom.add(key)
+        if len(self._pending) >= self.buffer_size:
+            self._spill()
+
+    def add(self,value):
+        """Método para registrar um ActivityId
+
+            Parameters
+            ----------
+            value : str ou int
+                ActivityId
+            Returns
+            -------
+            bool
+                True se o ID ainda não estava no índice
+        """
+        key = activity_key(value)
+        with self._lock:
+            if self._contains(key):
+                return False
+            self._add(key)
+            return True
+
+    def filter_page(self,page,field = "ActivityId"):
+        """Método que remove de uma página as linhas já vistas, inclusive as repetidas na própria página,
+        e registra as demais
+
+            Parameters
+            ----------
+            page : list
+                lista de dicionários, uma página da exportação
+            field : str
+                campo com o ID da atividade. O padrão é 'ActivityId'
+            Returns
+            -------
+            list
+                linhas ainda não vistas
+        """
+        rows = []
+        with self._lock:
+            for row in page:
+                key = activity_key(row[field])
+                if not self._contains(key):
+                    self._add(key)
+                    rows.append(row)
+        return rows
+
+    def _spill(self):
+        """Método interno que despeja as chaves pendentes, ordenadas, no arquivo não confirmado
+        """
+        tmp_path = _merge(self._new,sorted(self._pending),self._new.path)
+        self._new.close()
+        os.replace(tmp_path,self._new.path)
+        self._new = _SortedFile(self._new.path)
+        self._pending = set()
+
+    def commit(self):
+        """Método para incorporar as chaves novas ao arquivo do índice, tornando-as permanentes
+        """
+        with self._lock, lock_for(self.path):
+            if self._pending:
+                self._spill()
+            # outra instância pode ter confirmado chaves desde a última leitura
+            self._base.close()
+            self._base = _SortedFile(self.path)
+            stale_bloom = len(self._base) != self._bloom_keys
+            if len(self._new):
+                tmp_path = _merge(self._base,self._new.view,self.path)
+                self._base.close()
+                os.replace(tmp_path,self.path)
+                self._base = _SortedFile(self.path)
+                self._new.close()
+                os.remove(self._new.path)
+                self._new = _SortedFile(self._new.path)
+            if self.bloom is None:
+                # um filtro gravado antes deste commit não conteria as chaves novas
+                if os.path.exists(self.path + ".bloom"):
+                    os.remove(self.path + ".bloom")
+            else:
+                if stale_bloom:
+                    self._rebuild_bloom()
+                self.bloom.save(self.path + ".bloom",len(self._base))
+            self._bloom_keys = len(self._base)
+
+    def discard(self):
+        """Método para descartar as chaves adicionadas desde o último commit. Elas continuam no filtro de Bloom
+        em memória, o que só causa falsos positivos
+        """
+        with self._lock:
+            self._pending = set()
+            self._new.close()
+            if os.path.exists(self._new.path):
+                os.remove(self._new.path)
+            self._new = _SortedFile(self._new.path)
+
+    def close(self):
+        """Método para fechar os arquivos do índice, descartando as chaves não confirmadas
+        """
+        self.discard()
+        with self._lock:
+            self._base.close()
+            self._new.close()
+            if self._spill_lock is not None:
+                self._spill_lock.release()
+                self._spill_lock = None
+                try:
+                    os.remove(self._new.path + ".lock")
+                except OSError:
+                    pass
+
+
+def dedup_pages(pages,index,field = "ActivityId"):
+    """Gerador que remove, página a página, as linhas cujo ID já está no índice
+
+        Parameters
+        ----------
+        pages : iterable
+            páginas (listas de dicionários) da exportação
+        index : ActivityIndex
+            índice de IDs já vistos
+        field : str
+            campo com o ID da atividade. O padrão é 'ActivityId'
+        Yields
+        -------
+        list
+            página sem as linhas duplicadas; páginas que ficariam vazias são omitidas
+    """
+    for page in pages:
+        rows = index.filter_page(page,field = field)
+        if rows:
+            yield rows
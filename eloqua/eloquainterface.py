@@ -6,18 +6,108 @@ Created on Tue Oct  9 11:39:30 2018
 """
  
 import requests
+from requests.adapters import HTTPAdapter
 import base64 
 import json
 import time
 import logging
+import threading
+import os
+import random
+import hashlib
+import datetime
 from math import ceil 
+from urllib.parse import quote
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from .sinks import sink_for_path
+from .scheduler import RequestScheduler, EloquaRequestException
+from .metrics import Metrics
+from .dedup import ActivityIndex
+from .locks import lock_for
+from .campaigns import CampaignCatalog
+from .rows import RowCompactor, RowList, ROW_FORMATS
+
+
+# decodificador json usado nas respostas: orjson quando instalado, senão a biblioteca padrão.
+# Os dois aceitam bytes, então o corpo da resposta não precisa ser convertido para str antes
+_loads = orjson.loads if orjson is not None else json.loads
 
 class UserPasswordException(Exception):
     pass
 
+class SyncTimeoutException(Exception):
+    pass
+
+def _load_json(path):
+    """Função interna para ler um arquivo json de estado local
+
+        Parameters
+        ----------
+        path : str
+            caminho do arquivo
+        Returns
+        -------
+        dict
+            conteúdo do arquivo, ou um dicionário vazio se ele não existir ou estiver corrompido
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logging.warning("Arquivo de estado invalido: %s",path)
+        return {}
+
+def _dump_json(path,content):
+    """Função interna para gravar um arquivo json de estado local de forma atômica
+
+        Parameters
+        ----------
+        path : str
+            caminho do arquivo
+        content : dict
+            conteúdo a ser gravado
+    """
+    # escrevemos num arquivo temporário e renomeamos para não deixar o arquivo corrompido entre processos
+    tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(tmp_path, 'w') as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
 class EloquaInterface:
-    def __init__(self, site_name, user_name,password):
+    # endereço de descoberta dos endpoints da api para o usuário
+    login_url = "https://login.eloqua.com/id"
+    # número máximo de linhas por página na exportação da bulk api
+    page_limit = 50000
+    # número máximo de itens por página aceito pela api padrão 2.0
+    max_campaign_page_size = 1000
+    # formato das datas usadas nos filtros da bulk api
+    date_format = "%Y-%m-%d %H:%M:%S"
+    # métodos de construção de cada tipo de atividade exportada
+    activity_builders = {
+        "click": "build_click",
+        "open": "build_open",
+        "sent": "build_sent",
+        "bounce": "build_bounce",
+    }
+
+    def __init__(self, site_name, user_name,password,pool_size = 10,discovery_ttl = 3600,discovery_cache_path = None,
+                 poll_initial_delay = 1,poll_max_delay = 30,poll_jitter = 0.1,poll_timeout = None,
+                 export_cache_path = None,state_path = None,scheduler = None,metrics = None,dedup_path = None,
+                 dedup_bloom_capacity = None):
         """Construtor para a interface do eloqua
 
             Parameters
@@ -28,14 +118,116 @@ class EloquaInterface:
                usuário do Eloqua
             password : str
                 senha para o eloqua
+            pool_size : int
+                número máximo de conexões mantidas abertas (keep-alive) por host. O padrão é 10
+            discovery_ttl : int
+                tempo, em segundos, em que a resposta de login.eloqua.com/id é reutilizada. O padrão é 3600
+            discovery_cache_path : str
+                caminho opcional de um arquivo json onde a resposta da descoberta é persistida por site,
+                para que outros processos não precisem refazer a requisição. O padrão é None (somente em memória)
+            poll_initial_delay : float
+                espera, em segundos, antes da segunda verificação de status de uma sincronização. O padrão é 1
+            poll_max_delay : float
+                limite, em segundos, para a espera entre verificações, que dobra a cada tentativa. O padrão é 30
+            poll_jitter : float
+                fração aleatória aplicada a cada espera para não sincronizar vários processos. O padrão é 0.1
+            poll_timeout : float
+                tempo máximo, em segundos, aguardando as sincronizações. O padrão é None (sem limite)
+            export_cache_path : str
+                caminho opcional de um arquivo json onde as definições de exportação criadas são guardadas por site,
+                para serem reutilizadas entre execuções. O padrão é None (reutiliza somente nesta instância)
+            state_path : str
+                caminho opcional de um arquivo json com o estado das exportações incrementais (marcas d'água por site
+                e tipo de atividade). O padrão é None (o estado fica somente nesta instância)
+            scheduler : RequestScheduler
+                agendador com limite de taxa, concorrência e novas tentativas usado em todas as requisições.
+                Pode ser compartilhado entre interfaces do mesmo site. O padrão é None (um agendador próprio,
+                sem limite de taxa e com concorrência igual a pool_size)
+            metrics : Metrics
+                métricas por fase das requisições, com hooks e exportadores. O padrão é None (métricas próprias)
+            dedup_path : str
+                diretório onde ficam os índices de ActivityIds já exportados, um por site e tipo de atividade,
+                usados com dedup=True. O padrão é None
+            dedup_bloom_capacity : int
+                número de IDs esperado em cada índice de deduplicação; se informado, os índices usam um filtro
+                de Bloom antes da busca em disco. O padrão é None (sem filtro)
 
         """
         self.site_name = site_name
         self.user_name = user_name
         self.password = password
+        self.pool_size = pool_size
+        # header para autenticação com senha codificada, calculado uma única vez
+        header = site_name + '\\' + user_name + ":"+password
+        encoded_header = bytes("Basic ",'utf-8')+base64.standard_b64encode(bytes(header,  'utf-8'))
+        self._headers = {r'Authorization':encoded_header,r'Content-Type':"application/json"}
+        self._session_lock = threading.Lock()
+        self.session = self._build_session()
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler(max_concurrency = pool_size)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.discovery_ttl = discovery_ttl
+        self.discovery_cache_path = discovery_cache_path
+        self._discovery = None
+        self._discovery_time = 0
+        self._discovery_lock = threading.Lock()
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_max_delay = poll_max_delay
+        self.poll_jitter = poll_jitter
+        self.poll_timeout = poll_timeout
+        self.export_cache_path = export_cache_path
+        self._exports = _load_json(export_cache_path).get(site_name,{}) if export_cache_path is not None else {}
+        # definições devolvidas do cache, por uri, para recriá-las se o Eloqua não as reconhecer mais
+        self._reused_exports = {}
+        self._export_lock = threading.Lock()
+        self.state_path = state_path
+        self._state = _load_json(state_path).get(site_name,{}) if state_path is not None else {}
+        self._state_lock = threading.Lock()
+        self.dedup_path = dedup_path
+        self.dedup_bloom_capacity = dedup_bloom_capacity
+        self._dedup_indexes = {}
+        self._dedup_lock = threading.Lock()
+
+    def _build_session(self):
+        """Método interno para criar a sessão http com pool de conexões persistentes
 
-    def req(self,url,method = 'get',data ={}):
+            Returns
+            -------
+            requests.Session
+                sessão compartilhada por todas as requisições desta interface
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        """Método para fechar a sessão http e liberar as conexões do pool e os índices de deduplicação abertos
+        """
+        with self._session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+        self._close_dedup_indexes()
+
+    def _close_dedup_indexes(self):
+        """Método interno que fecha os índices de deduplicação abertos por get_dedup_index
+        """
+        with self._dedup_lock:
+            for index in self._dedup_indexes.values():
+                index.close()
+            self._dedup_indexes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def req(self,url,method = 'get',data ={},phase = None):
         """Método para fazer uma requisição http
+        passando pelo scheduler, que aplica o limite de taxa e de concorrência e repete falhas temporárias.
+        Levanta EloquaRequestException se o Eloqua devolver um erro http depois das novas tentativas
 
             Parameters
             ----------
@@ -45,28 +237,172 @@ class EloquaInterface:
                O método http a ser utilizado(o padrão é 'get')
             data : dict
                 dicionário de dados contendo os parâmetros que necessários para um método post. O padrão é um dicionário vazio
+            phase : str
+                fase usada nas métricas (discover, build, sync, poll, download ou campaigns). O padrão é None
              Returns
             -------
             dict
                 Dicionário com a resposta do servidor 
         """
-        site_name = self.site_name
-        user_name = self.user_name 
-        password = self.password
-        # header para autenticação com senha codificada
-        header = site_name + '\\' + user_name + ":"+password
-        encoded_header = bytes("Basic ",'utf-8')+base64.standard_b64encode(bytes(header,  'utf-8'))
-        header = {r'Authorization':encoded_header,r'Content-Type':"application/json"}
-        
-        if method == 'get':
-            r = requests.get(url, headers=header)
-        else: 
-            r = requests.post(url, headers=header,data = json.dumps(data))
-        response = json.loads(r.text)
+        session = self._get_session()
+        on_retry = lambda status: self.metrics.record_retry(phase,status)
+        start = time.perf_counter()
+        try:
+            # os headers são passados por requisição para não alterar o estado da sessão, que é compartilhada entre threads
+            if method == 'get':
+                r = self.scheduler.run(method,url,lambda: session.get(url, headers=self._headers),on_retry)
+            else: 
+                body = json.dumps(data)
+                r = self.scheduler.run(method,url,lambda: session.post(url, headers=self._headers,data = body),on_retry)
+        except EloquaRequestException as exc:
+            self.metrics.record_request(phase,method,url,exc.status_code,time.perf_counter() - start)
+            raise
+        except requests.RequestException:
+            self.metrics.record_request(phase,method,url,None,time.perf_counter() - start)
+            raise
+        content = r.content
+        self.metrics.record_request(phase,method,url,r.status_code,time.perf_counter() - start,len(content))
+        start = time.perf_counter()
+        response = _loads(content)
+        self.metrics.record_decode(phase,time.perf_counter() - start)
         return response
+
+    def _get_session(self):
+        """Método interno que devolve a sessão http, recriando-a se ela tiver sido fechada
+
+            Returns
+            -------
+            requests.Session
+                sessão compartilhada por todas as requisições desta interface
+        """
+        session = self.session
+        if session is None:
+            with self._session_lock:
+                if self.session is None:
+                    self.session = self._build_session()
+                session = self.session
+        return session
+
+    def _stream_items(self,url,metadata):
+        """Gerador interno que decodifica o array items de uma resposta conforme ela é recebida, sem carregar o
+        corpo inteiro em memória. Requer o pacote opcional ijson
+
+            Parameters
+            ----------
+            url : str
+                endereço da página de dados
+            metadata : dict
+                dicionário preenchido com os campos escalares da resposta (count, hasMore, totalResults, ...)
+            Yields
+            -------
+            dict
+                uma linha do array items
+        """
+        if ijson is None:
+            raise ImportError("A leitura em streaming requer o pacote ijson (pip install ijson)")
+        session = self._get_session()
+        start = time.perf_counter()
+        on_retry = lambda status: self.metrics.record_retry('download',status)
+        with self.scheduler.run('get',url,lambda: session.get(url, headers=self._headers, stream=True),on_retry) as r:
+            self.metrics.record_request('download','get',url,r.status_code,time.perf_counter() - start,
+                                        int(r.headers.get('Content-Length') or 0))
+            r.raw.decode_content = True
+            builder = None
+            for prefix, event, value in ijson.parse(r.raw, use_float=True):
+                if prefix == 'items.item':
+                    if event == 'start_map':
+                        builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    if event == 'end_map':
+                        yield builder.value
+                        builder = None
+                elif builder is not None:
+                    builder.event(event, value)
+                elif '.' not in prefix and event in ('boolean','integer','number','string','null'):
+                    metadata[prefix] = value
     
+    def _read_discovery_cache(self):
+        """Método interno para ler a resposta de descoberta persistida em disco para este site
+
+            Returns
+            -------
+            dict
+                resposta de login.eloqua.com/id, ou None se não houver uma resposta válida no arquivo
+        """
+        if self.discovery_cache_path is None:
+            return None
+        entry = _load_json(self.discovery_cache_path).get(self.site_name)
+        if entry is None or time.time() - entry["timestamp"] > self.discovery_ttl:
+            return None
+        self._discovery_time = entry["timestamp"]
+        return entry["response"]
+
+    def _write_discovery_cache(self,response):
+        """Método interno para persistir a resposta de descoberta em disco, chaveada pelo nome do site
+
+            Parameters
+            ----------
+            response : dict
+                resposta de login.eloqua.com/id
+        """
+        if self.discovery_cache_path is None:
+            return
+        cache = _load_json(self.discovery_cache_path)
+        cache[self.site_name] = {"timestamp": self._discovery_time, "response": response}
+        _dump_json(self.discovery_cache_path,cache)
+
+    def get_discovery(self,refresh = False):
+        """Método para adquirir a resposta de login.eloqua.com/id, reutilizando-a enquanto o ttl for válido
+
+            Parameters
+            ----------
+            refresh : bool
+                força uma nova requisição, ignorando os caches. O padrão é False
+            Returns
+            -------
+            dict
+                dicionário com a resposta de login.eloqua.com/id
+        """
+        with self._discovery_lock:
+            if not refresh:
+                if self._discovery is not None and time.time() - self._discovery_time <= self.discovery_ttl:
+                    return self._discovery
+                cached = self._read_discovery_cache()
+                if cached is not None:
+                    self._discovery = cached
+                    return cached
+            response = self.req(self.login_url,phase = 'discover')
+            # só guardamos respostas válidas, para não reutilizar um erro de autenticação
+            if isinstance(response, dict) and 'urls' in response:
+                self._discovery = response
+                self._discovery_time = time.time()
+                self._write_discovery_cache(response)
+            return response
+
+    def _api_url(self,root_response,api):
+        """Método interno que lê o endereço de uma api na resposta da descoberta
+
+            Parameters
+            ----------
+            root_response : dict
+                resposta de login.eloqua.com/id
+            api : str
+                'bulk' ou 'standard'
+            Returns
+            -------
+            str
+                endereço da api na versão 2.0
+        """
+        try:
+            return root_response['urls']['apis']['rest'][api].replace('{version}','2.0')
+        except (KeyError, TypeError, AttributeError):
+            # o Eloqua responde sem as urls (por exemplo 'Not authenticated.') quando as credenciais são inválidas
+            logging.error("Erro ao ler a resposta: %s",root_response)
+            raise UserPasswordException("Resposta inválida de {}: {}".format(self.login_url,root_response))
+
     def get_bulk_url(self):
-        """Método para adquirir o url para a api bulk
+        """Método para adquirir o url para a api bulk. Erros da requisição são propagados, e uma resposta
+        sem o endereço gera UserPasswordException
 
             Parameters
             ----------
@@ -75,20 +411,11 @@ class EloquaInterface:
             str
                 string contendo o endereço url da api bulk
         """
-        
-        url = "https://login.eloqua.com/id"
-        try:
-            root_response = self.req(url)
-            
-            try:
-                return root_response['urls']['apis']['rest']['bulk'].replace('{version}','2.0')
-            except:
-                    print("Erro ao ler a resposta:"+root_response)
-        except:
-            print("Erro na requisição")
+        return self._api_url(self.get_discovery(),'bulk')
    
     def get_standard_url(self):
-        """Método para adquirir o url para a api padrão 2.0
+        """Método para adquirir o url para a api padrão 2.0. Erros da requisição são propagados, e uma resposta
+        sem o endereço gera UserPasswordException
 
             Parameters
             ----------
@@ -97,44 +424,72 @@ class EloquaInterface:
             str
                 string contendo o endereço url da api padrão 2.0
         """
-        
-        url = "https://login.eloqua.com/id"
-        try:
-            root_response = self.req(url)
-            try:
-                return root_response['urls']['apis']['rest']['standard'].replace('{version}','2.0')
-            except:
-                print("Erro na resposta: {}".format(root_response))
-        except:
-            print("Erro na requisição")
+        return self._api_url(self.get_discovery(),'standard')
     
-    def get_campaigns(self):
+    def get_campaigns(self,page_size = 500,workers = 1,updated_since = None):
         """Método para adquirir todas as campanhas do eloqua. Usamos a versão 2.0 da api
 
             Parameters
             ----------
+            page_size : int
+                número de campanhas por página, limitado a max_campaign_page_size. O padrão é 500
+            workers : int
+                número de páginas buscadas em paralelo após a primeira. O padrão é 1 (sequencial)
+            updated_since : str
+                se informado, busca somente as campanhas com updatedAt (em segundos desde 1970) maior ou igual
+                a este valor. O padrão é None (todas)
             Returns
             -------
-            str
-                string contendo o endereço url da api padrão 2.0
+            list
+                lista com todas as campanhas, na ordem das páginas
         """ 
         std_url = self.get_standard_url()
+        page_size = min(page_size,self.max_campaign_page_size)
         page = 1
-        page_size = 500
         campaigns = []
-        campaign_url = std_url + "assets/campaigns?count={}&page={}".format(page_size,page)
-        root_response = self.req(campaign_url)
+        search = "&search=" + quote("updatedAt>='{}'".format(updated_since)) if updated_since is not None else ""
+        campaign_url = std_url + "assets/campaigns?count={}&page={}".format(page_size,page) + search
+        root_response = self.req(campaign_url,phase = 'campaigns')
         total = root_response["total"]
-        print("Total: {}".format(total))
+        logging.debug("Total de campanhas: %s",total)
         campaigns.extend(root_response["elements"])
         pages = int(ceil(total/page_size))
         if pages > 1:
-            for i in range(2,pages+1):
-                page = i
-                campaign_url = std_url + "assets/campaigns?count={}&page={}".format(page_size,page)
-                root_response = self.req(campaign_url)
-                campaigns.extend(root_response["elements"])
+            def fetch(page):
+                campaign_url = std_url + "assets/campaigns?count={}&page={}".format(page_size,page) + search
+                return self.req(campaign_url,phase = 'campaigns')["elements"]
+            if workers > 1:
+                # map devolve os resultados na ordem das páginas
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for elements in executor.map(fetch,range(2,pages+1)):
+                        campaigns.extend(elements)
+            else:
+                for page in range(2,pages+1):
+                    campaigns.extend(fetch(page))
         return campaigns
+
+    def get_campaign_catalog(self,path = None,fields = None,refresh = True,workers = 1):
+        """Método para adquirir o catálogo de campanhas indexado por id e por nome, atualizado de forma incremental
+
+            Parameters
+            ----------
+            path : str
+                caminho opcional do arquivo json com o snapshot do catálogo. O padrão é None (somente em memória)
+            fields : list
+                campos guardados de cada campanha, além de id, name e updatedAt. O padrão é None (todos)
+            refresh : bool
+                busca as campanhas alteradas desde o snapshot antes de devolver o catálogo. O padrão é True
+            workers : int
+                número de páginas buscadas em paralelo. O padrão é 1
+            Returns
+            -------
+            CampaignCatalog
+                catálogo das campanhas deste site
+        """
+        catalog = CampaignCatalog(self,path = path,fields = fields)
+        if refresh:
+            catalog.refresh(workers = workers)
+        return catalog
         
     def check_data(self,url,data_uri):
         """Método para verificar o status da api para exportação de dados
@@ -152,9 +507,103 @@ class EloquaInterface:
                 dicionário de resposta da requisição 
         """
         get_data_url = url+data_uri
-        return self.req(get_data_url,method='get')   
+        return self.req(get_data_url,method='get',phase = 'poll')
     def get_sync_log(self,url):
-        """Método para adquirir os dados necessários
+        """Método para adquirir o log de uma sincronização, registrando-o no logging
+
+            Parameters
+            ----------
+            url : str
+                url da sincronização (url da bulk api + uri da sincronização)
+                
+            Returns
+            -------
+            dict
+                dicionário de resposta com os itens do log
+        """
+        log_response = self.req(url+'/logs',method='get',phase = 'poll')
+        logging.error("Log da sincronizacao %s: %s",url,log_response)
+        return log_response
+
+    def _poll_delay(self,delay):
+        """Método interno que aplica o jitter a uma espera do polling
+
+            Parameters
+            ----------
+            delay : float
+                espera base, em segundos
+            Returns
+            -------
+            float
+                espera a ser usada, em segundos
+        """
+        return max(0,delay*(1+random.uniform(-self.poll_jitter,self.poll_jitter)))
+
+    def _check_sync_status(self,url,data_uri,check_response):
+        """Método interno que interpreta a resposta de status de uma sincronização
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri da sincronização
+            check_response : dict
+                resposta de check_data
+            Returns
+            -------
+            bool
+                True se a sincronização terminou com sucesso
+        """
+        status = check_response["status"]
+        logging.debug("Status da syncronizacao %s: %s",data_uri,status)
+        if status == 'error':
+            logging.error("Erro no sync: {}".format(check_response))
+            self.get_sync_log(url+data_uri)
+            raise Exception("Erro na sicronização")
+        return status == "success"
+
+    def wait_syncs(self,url,data_uris):
+        """Gerador que acompanha várias sincronizações num único loop de polling. A cada rodada todas as
+        sincronizações pendentes são verificadas juntas, e cada uma é devolvida assim que termina, para que o
+        download comece imediatamente. A espera entre rodadas começa em poll_initial_delay e dobra até poll_max_delay.
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uris : list
+                lista de uris das sincronizações
+                
+            Yields
+            -------
+            tuple
+                (data_uri, resposta de status) de cada sincronização concluída
+        """
+        pending = list(data_uris)
+        start = time.time()
+        delay = self.poll_initial_delay
+        with ThreadPoolExecutor(max_workers=max(1,min(len(pending),self.pool_size))) as executor:
+            while pending:
+                responses = list(executor.map(lambda data_uri: self.check_data(url,data_uri),pending))
+                still_pending = []
+                for data_uri,check_response in zip(pending,responses):
+                    if self._check_sync_status(url,data_uri,check_response):
+                        self.metrics.record_sync(data_uri,check_response,time.time() - start)
+                        yield data_uri,check_response
+                    else:
+                        still_pending.append(data_uri)
+                pending = still_pending
+                if not pending:
+                    return
+                sleep_time = self._poll_delay(delay)
+                if self.poll_timeout is not None and time.time() - start + sleep_time > self.poll_timeout:
+                    raise SyncTimeoutException("Sincronizações não concluídas em {}s: {}".format(self.poll_timeout,pending))
+                time.sleep(sleep_time)
+                delay = min(delay*2,self.poll_max_delay)
+
+    def _wait_sync(self,url,data_uri):
+        """Método interno que aguarda a sincronização dos dados terminar
 
             Parameters
             ----------
@@ -165,14 +614,15 @@ class EloquaInterface:
                 
             Returns
             -------
-            list
-                lista com todos os dados adquiridos 
+            dict
+                dicionário com a última resposta de status da sincronização
         """
-        print(self.req(url+'/logs',method='get'))
-        return 'Teste' 
+        for _,check_response in self.wait_syncs(url,[data_uri]):
+            pass
+        return check_response
 
-    def get_data(self,url,data_uri):
-        """Método para adquirir os dados necessários
+    def _fetch_page(self,url,data_uri,offset):
+        """Método interno para buscar uma página dos dados exportados
 
             Parameters
             ----------
@@ -180,50 +630,250 @@ class EloquaInterface:
                 url da bulk api para este usuário
             data_uri : str
                 uri do dado a ser exportado
+            offset : int
+                posição da primeira linha da página
                 
             Returns
             -------
+            dict
+                dicionário de resposta da requisição, contendo items, hasMore e totalResults
+        """
+        get_data_url = url+data_uri+"/data?limit={}&offset={}".format(self.page_limit,offset)
+        get_data_response = self.req(get_data_url,method='get',phase = 'download')
+        self.metrics.record_rows('download',get_data_response["count"])
+        logging.debug("Resposta: offset: %s, count: %s, hasMore: %s",offset,get_data_response["count"],get_data_response["hasMore"])
+        return get_data_response
+
+    def _iter_pages_parallel(self,url,data_uri,total,workers,ordered,start_offset = 0):
+        """Método interno que busca os offsets restantes de uma sincronização concluída em paralelo.
+        No máximo 2*workers páginas ficam pendentes ao mesmo tempo.
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            total : int
+                totalResults informado pela primeira página
+            workers : int
+                número de threads fazendo download
+            ordered : bool
+                se True, as páginas são devolvidas na ordem dos offsets
+            start_offset : int
+                offset da primeira página, já lida pelo chamador. O padrão é 0
+                
+            Yields
+            -------
             list
-                lista com todos os dados adquiridos 
+                lista com as linhas de uma página
         """
+        # a primeira página já foi lida, então começamos do segundo offset
+        offsets = iter(range(start_offset+self.page_limit,total,self.page_limit))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            def submit_next(pending):
+                for offset in offsets:
+                    pending.append(executor.submit(self._fetch_page,url,data_uri,offset))
+                    return
+            if ordered:
+                pending = deque()
+                for _ in range(2*workers):
+                    submit_next(pending)
+                while pending:
+                    response = pending.popleft().result()
+                    submit_next(pending)
+                    yield response["items"]
+            else:
+                pending = []
+                for _ in range(2*workers):
+                    submit_next(pending)
+                pending = set(pending)
+                while pending:
+                    done, pending = wait(pending,return_when=FIRST_COMPLETED)
+                    new = []
+                    for _ in done:
+                        submit_next(new)
+                    pending.update(new)
+                    for future in done:
+                        yield future.result()["items"]
+
+    def iter_pages(self,url,data_uri,workers = 1,ordered = True,start_offset = 0,wait = True):
+        """Gerador que devolve os dados exportados página a página, conforme são baixados.
+        Sem paralelismo, apenas uma página fica em memória por vez.
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            workers : int
+                número de páginas baixadas em paralelo após a primeira. O padrão é 1 (sequencial).
+                Use um pool_size no construtor de pelo menos este valor
+            ordered : bool
+                se True, as páginas são devolvidas na ordem dos offsets; se False, na ordem em que terminam. O padrão é True
+            start_offset : int
+                offset a partir do qual os dados são lidos, múltiplo de page_limit. O padrão é 0
+            wait : bool
+                aguarda a sincronização terminar antes do download; use False se o status success já foi visto. O padrão é True
+                
+            Yields
+            -------
+            list
+                lista com as linhas de uma página (até page_limit linhas)
+        """
+        if wait:
+            self._wait_sync(url,data_uri)
         #buscaremos os daos de 50 mil linhas por vez, se houver mais de que isso, estrá no próximo offset
+        get_data_response = self._fetch_page(url,data_uri,start_offset)
+        if get_data_response["totalResults"] <= 0:
+            return
+        yield get_data_response["items"]
+        if not get_data_response["hasMore"]:
+            return
+        if workers > 1:
+            # com a sincronização concluída, o totalResults da primeira página já define todos os offsets
+            for page in self._iter_pages_parallel(url,data_uri,get_data_response["totalResults"],workers,ordered,start_offset):
+                yield page
+            return
+        offset = start_offset
+        while get_data_response["hasMore"]:
+            #mudando o offset para buscar as proximas linhas 
+            offset += self.page_limit
+            get_data_response = self._fetch_page(url,data_uri,offset)
+            yield get_data_response["items"]
+
+    def iter_data(self,url,data_uri,workers = 1,ordered = True,compact = None,fields = None):
+        """Gerador que devolve os dados exportados linha a linha, conforme as páginas são baixadas
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            workers : int
+                número de páginas baixadas em paralelo. O padrão é 1 (sequencial)
+            ordered : bool
+                se True, mantém a ordem dos offsets. O padrão é True
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
+            fields : list
+                campos da exportação, na ordem das colunas das linhas compactas. O padrão é None (as chaves da
+                primeira linha)
+                
+            Yields
+            -------
+            dict
+                uma linha dos dados exportados
+        """
+        pages = self.iter_pages(url,data_uri,workers = workers,ordered = ordered)
+        if compact:
+            if compact not in ROW_FORMATS:
+                raise ValueError("Formato de linha desconhecido: {}".format(compact))
+            pages = self._compact_pages(pages,compact,fields)
+        for page in pages:
+            for row in page:
+                yield row
+
+    def iter_data_stream(self,url,data_uri):
+        """Gerador que devolve os dados exportados linha a linha, decodificando cada página em streaming.
+        Nem o texto nem a lista de itens de uma página ficam inteiros em memória. Requer o pacote opcional ijson
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+                
+            Yields
+            -------
+            dict
+                uma linha dos dados exportados
+        """
+        self._wait_sync(url,data_uri)
         offset = 0
-        get_data_url = url+data_uri+"/data?limit=50000&offset={}".format(offset)
-        # assumimos que o a api de exportação de dados não está pronta 
-        status = "pending"
-        count =0
-        sleep_time = 10
-        check_response = self.check_data(url,data_uri)
-        status = check_response["status"]
-        
-        # Enquanto o status da api estiver pending, estaremos em loop. Há um contador limite que não deixa esperarmos para sempre.  
-        while status != "success":
-            time.sleep(sleep_time)
-            sleep_time = sleep_time*2
-            check_response = self.check_data(url,data_uri)
-            status = check_response["status"]
-            logging.debug("Status da syncronizacao: %s",status)
-            if status == 'error':
-                logging.error("Erro no sync: {}".format(check_response))
-                self.get_sync_log(url+data_uri)
-                raise Exception("Erro na sicronização")
-            count+=1
-            
-        get_data_response = self.req(get_data_url,method='get')
-        print("Resposta: count: {}, hasMore: {}".format(get_data_response["count"],get_data_response["hasMore"]))
-            
-        if get_data_response["totalResults"] > 0:
-            data = get_data_response["items"]
-            # Se houver mais linhas pendentes, ira fazer mais requisições para adquirir todas. Cada loop adquire 50k linhas.
-            while get_data_response["hasMore"]:  
-                #mudando o offset para buscar as proximas linhas 
-                offset += 50000
-                get_data_url = url+data_uri+"/data?limit=50000&offset={}".format(offset)
-                get_data_response = self.req(get_data_url,method='get')
-                print("Resposta: count: {}, hasMore{}".format(get_data_response["count"],get_data_response["hasMore"]))
-                data.extend(get_data_response["items"])
-        else:
-            data = []
+        while True:
+            metadata = {}
+            get_data_url = url+data_uri+"/data?limit={}&offset={}".format(self.page_limit,offset)
+            rows = 0
+            for row in self._stream_items(get_data_url,metadata):
+                rows += 1
+                yield row
+            self.metrics.record_rows('download',rows)
+            logging.debug("Resposta: offset: %s, count: %s, hasMore: %s",offset,metadata.get("count"),metadata.get("hasMore"))
+            if not metadata.get("hasMore"):
+                return
+            offset += self.page_limit
+
+    def _compact_pages(self,pages,compact,fields,rows = None):
+        """Gerador interno que converte as páginas para o formato compacto, criando o conversor na primeira página
+
+            Parameters
+            ----------
+            pages : iterable
+                páginas (listas de dicionários) da exportação
+            compact : str
+                'record' ou 'tuple'
+            fields : list
+                campos da exportação, ou None para usar as chaves da primeira linha
+            rows : RowList
+                lista que recebe o cabeçalho assim que ele é conhecido. O padrão é None
+            Yields
+            -------
+            list
+                página com as linhas compactas
+        """
+        compactor = None
+        for page in pages:
+            if compactor is None:
+                if fields is None and not page:
+                    continue
+                compactor = RowCompactor(fields if fields is not None else page[0].keys(),compact)
+                if rows is not None:
+                    rows.header = compactor.header
+            yield compactor.compact_page(page)
+
+    def get_data(self,url,data_uri,workers = 1,ordered = True,compact = None,fields = None,wait = True):
+        """Método para adquirir os dados necessários
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            workers : int
+                número de páginas baixadas em paralelo. O padrão é 1 (sequencial)
+            ordered : bool
+                se True, mantém a ordem dos offsets; se False, as páginas entram na ordem em que terminam. O padrão é True
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
+            fields : list
+                campos da exportação, na ordem das colunas das linhas compactas. O padrão é None (as chaves da
+                primeira linha)
+            wait : bool
+                aguarda a sincronização terminar antes do download; use False se o status success já foi visto. O padrão é True
+                
+            Returns
+            -------
+            list
+                lista com todos os dados adquiridos. No modo compacto, uma RowList com o cabeçalho em header
+        """
+        if compact and compact not in ROW_FORMATS:
+            raise ValueError("Formato de linha desconhecido: {}".format(compact))
+        pages = self.iter_pages(url,data_uri,workers = workers,ordered = ordered,wait = wait)
+        if compact:
+            data = RowList(header = fields or ())
+            for page in self._compact_pages(pages,compact,fields,data):
+                data.extend(page)
+            return data
+        data = []
+        for page in pages:
+            data.extend(page)
         return data
     
     def syc_data(self,url,export_url):
@@ -245,12 +895,100 @@ class EloquaInterface:
         data = {
                 "syncedInstanceUri" : export_url
                 }
-        response = self.req(syc_url,data = data,method= 'post')
+        response = self.req(syc_url,data = data,method= 'post',phase = 'sync')
         return response
 
 
-    def build_export(self,bulk_api_url,data):
-        """Método para construir a api de dados a ser exportada
+    def _export_key(self,data):
+        """Método interno que calcula a chave canônica de uma definição de exportação
+
+            Parameters
+            ----------
+            data : dict
+                dicionário com a definição da exportação
+            Returns
+            -------
+            str
+                hash sha256 dos campos e do filtro da exportação
+        """
+        canonical = json.dumps({"fields": data.get("fields"), "filter": data.get("filter")},sort_keys=True,separators=(',',':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _cached_export(self,data):
+        """Método interno que busca uma definição de exportação já criada com os mesmos campos e filtro
+
+            Parameters
+            ----------
+            data : dict
+                dicionário com a definição da exportação
+            Returns
+            -------
+            dict
+                resposta da criação original, ou None se não houver
+        """
+        return self._exports.get(self._export_key(data))
+
+    def _store_export(self,data,response):
+        """Método interno que guarda uma definição de exportação criada, persistindo-a se houver export_cache_path
+
+            Parameters
+            ----------
+            data : dict
+                dicionário com a definição da exportação
+            response : dict
+                resposta da criação da exportação
+        """
+        if not isinstance(response,dict) or "uri" not in response:
+            return
+        with self._export_lock:
+            self._exports[self._export_key(data)] = response
+            if self.export_cache_path is not None:
+                cache = _load_json(self.export_cache_path)
+                cache.setdefault(self.site_name,{})[self._export_key(data)] = response
+                _dump_json(self.export_cache_path,cache)
+
+    def forget_export(self,data):
+        """Método para descartar uma definição de exportação guardada, por exemplo se ela foi apagada no Eloqua
+
+            Parameters
+            ----------
+            data : dict
+                dicionário com a definição da exportação
+        """
+        with self._export_lock:
+            self._exports.pop(self._export_key(data),None)
+            if self.export_cache_path is not None:
+                cache = _load_json(self.export_cache_path)
+                cache.get(self.site_name,{}).pop(self._export_key(data),None)
+                _dump_json(self.export_cache_path,cache)
+
+    def _stale_export(self,bulk_response,error):
+        """Método interno que verifica se a falha ao sincronizar veio de uma definição reutilizada do cache que
+        não existe mais no Eloqua (apagada, ou o cache é de outra instância). Nesse caso ela é descartada
+
+            Parameters
+            ----------
+            bulk_response : dict
+                resposta da construção da exportação
+            error : EloquaRequestException
+                erro da requisição de sincronização
+            Returns
+            -------
+            dict
+                definição da exportação a ser recriada, ou None se o erro não vem do cache
+        """
+        if not 400 <= error.status_code < 500 or error.status_code == 429:
+            return None
+        with self._export_lock:
+            data = self._reused_exports.pop(str(bulk_response.get("uri")),None)
+        if data is not None:
+            logging.warning("Exportacao %s do cache recusada (%s), recriando-a",bulk_response.get("uri"),error.status_code)
+            self.forget_export(data)
+        return data
+
+    def build_export(self,bulk_api_url,data,reuse = True,cache = True):
+        """Método para construir a api de dados a ser exportada. Se já existir uma definição com os mesmos
+        campos e filtro, sua uri é reutilizada sem uma nova requisição
 
             Parameters
             ----------
@@ -258,15 +996,30 @@ class EloquaInterface:
                 url da bulk api para este usuário
             data : dict
                 dicionário contento os dados necessários para a cosntrução da api             
+            reuse : bool
+                se False, sempre cria uma nova definição. O padrão é True
+            cache : bool
+                se False, a definição criada não é guardada para reutilização, como nos filtros de uso único
+                gerados pelas exportações incrementais e por janelas. O padrão é True
             Returns
             -------
             dict
                 dicionário contento a resposta da requisição 
         """
+        if reuse:
+            cached = self._cached_export(data)
+            if cached is not None:
+                logging.debug("Reutilizando a exportacao: %s",cached["uri"])
+                with self._export_lock:
+                    self._reused_exports[str(cached["uri"])] = data
+                return cached
         bulk_end_point = "activities/exports"
-        return self.req(bulk_api_url+bulk_end_point,method = 'post',data = data)
+        response = self.req(bulk_api_url+bulk_end_point,method = 'post',data = data,phase = 'build')
+        if cache:
+            self._store_export(data,response)
+        return response
 
-    def build_click(self,bulk_api_url,extra_filter = None) :
+    def build_click(self,bulk_api_url,extra_filter = None,cache = True) :
         """Método para construir a api de dados de clique 
 
             Parameters
@@ -277,6 +1030,8 @@ class EloquaInterface:
                 dicionario contendo os camps para serem filtrados como chave, 
                 e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
                 referencia:https://docs.oracle.com/cloud/latest/marketingcs_gs/OMCAB/Developers/BulkAPI/Tutorials/Filtering.htm             
+            cache : bool
+                se False, a definição criada não é guardada para reutilização. O padrão é True
             Returns
             -------
             dict
@@ -309,9 +1064,9 @@ class EloquaInterface:
         }
         if extra_filter is not None:
             data['filter'] = self._add_filters(data['filter'],extra_filter)    
-        return self.build_export(bulk_api_url,data)  
+        return self.build_export(bulk_api_url,data,cache = cache)
 
-    def build_bounce(self,bulk_api_url):
+    def build_bounce(self,bulk_api_url,extra_filter = None,cache = True):
         """Método para construir a api de dados de bounce 
 
             Parameters
@@ -322,6 +1077,8 @@ class EloquaInterface:
                 dicionario contendo os camps para serem filtrados como chave, 
                 e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
                 referencia:https://docs.oracle.com/cloud/latest/marketingcs_gs/OMCAB/Developers/BulkAPI/Tutorials/Filtering.htm            
+            cache : bool
+                se False, a definição criada não é guardada para reutilização. O padrão é True
             Returns
             -------
             dict
@@ -348,9 +1105,11 @@ class EloquaInterface:
             },
         "filter": "'{{Activity.Type}}' = 'Bounceback'",
         }
-        return self.build_export(bulk_api_url,data)
+        if extra_filter is not None:
+            data['filter'] = self._add_filters(data['filter'],extra_filter)
+        return self.build_export(bulk_api_url,data,cache = cache)
 
-    def build_open(self,bulk_api_url,extra_filter = None):
+    def build_open(self,bulk_api_url,extra_filter = None,cache = True):
         """Método para construir a api de dados de email enviados 
 
             Parameters
@@ -361,6 +1120,8 @@ class EloquaInterface:
                 dicionario contendo os camps para serem filtrados como chave, 
                 e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
                 referencia:https://docs.oracle.com/cloud/latest/marketingcs_gs/OMCAB/Developers/BulkAPI/Tutorials/Filtering.htm           
+            cache : bool
+                se False, a definição criada não é guardada para reutilização. O padrão é True
             Returns
             -------
             dict
@@ -395,8 +1156,8 @@ class EloquaInterface:
                 }
         if extra_filter is not None:
             data['filter'] = self._add_filters(data['filter'],extra_filter)    
-        return self.build_export(bulk_api_url,data)
-    def build_sent(self,bulk_api_url,extra_filter = None):
+        return self.build_export(bulk_api_url,data,cache = cache)
+    def build_sent(self,bulk_api_url,extra_filter = None,cache = True):
         """Método para construir a api de dados de email enviados 
 
                 Parameters
@@ -407,6 +1168,8 @@ class EloquaInterface:
                     referencia:https://docs.oracle.com/cloud/latest/marketingcs_gs/OMCAB/Developers/BulkAPI/Tutorials/Filtering.htm  
                 bulk_api_url : str
                     url da bulk api para este usuário           
+                cache : bool
+                    se False, a definição criada não é guardada para reutilização. O padrão é True
                 Returns
                 -------
                 dict
@@ -431,7 +1194,30 @@ class EloquaInterface:
             }
         if extra_filter is not None:
             data['filter'] = self._add_filters(data['filter'],extra_filter)
-        return self.build_export(bulk_api_url,data)
+        return self.build_export(bulk_api_url,data,cache = cache)
+
+    def build_activity(self,bulk_api_url,activity_type,extra_filter = None,cache = True):
+        """Método para construir a api de dados de um tipo de atividade
+
+            Parameters
+            ----------
+            bulk_api_url : str
+                url da bulk api para este usuário
+            activity_type : str
+                tipo de atividade, uma das chaves de activity_builders ('click', 'open', 'sent' ou 'bounce')
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            cache : bool
+                se False, a definição criada não é guardada para reutilização. O padrão é True
+            Returns
+            -------
+            dict
+                dicionário contento a resposta da requisição 
+        """
+        if activity_type not in self.activity_builders:
+            raise ValueError("Tipo de atividade desconhecido: {}".format(activity_type))
+        return getattr(self,self.activity_builders[activity_type])(bulk_api_url,extra_filter = extra_filter,cache = cache)
 
     def _add_filters(self,old_filter,extra_filter):
         """Método interno para formatar o filtro 
@@ -454,7 +1240,34 @@ class EloquaInterface:
                 new_filter = new_filter + " AND '{}' {} '{}'".format(key,condition["op"],condition['value'])
         return new_filter
 
-    def get_click_data(self,extra_filter = None):
+    def _start_sync(self,bulk_api_url,bulk_response):
+        """Método interno para sincronizar uma exportação recém construída
+
+            Parameters
+            ----------
+            bulk_api_url : str
+                url da bulk api para este usuário
+            bulk_response : dict
+                resposta da construção da exportação
+            Returns
+            -------
+            str
+                uri da sincronização, usada para buscar os dados
+        """
+        build_uri = str(bulk_response["uri"])
+        logging.debug("Endereço de exportacao: %s",build_uri)
+        logging.info("Iniciando a sincronizacao da API")
+        try:
+            syc_response = self.syc_data(bulk_api_url,build_uri)
+        except EloquaRequestException as error:
+            data = self._stale_export(bulk_response,error)
+            if data is None:
+                raise
+            bulk_response = self.build_export(bulk_api_url,data,reuse = False)
+            syc_response = self.syc_data(bulk_api_url,str(bulk_response["uri"]))
+        return syc_response["uri"]
+
+    def get_click_data(self,extra_filter = None,compact = None):
         """Método para buscar todos os dados de clique  
 
             Parameters
@@ -463,6 +1276,9 @@ class EloquaInterface:
                 dicionario contendo os camps para serem filtrados como chave, 
                 e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
                 referencia:https://docs.oracle.com/cloud/latest/marketingcs_gs/OMCAB/Developers/BulkAPI/Tutorials/Filtering.htm       
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
             Returns
             -------
             list
@@ -470,12 +1286,10 @@ class EloquaInterface:
         """
         bulk_api_url = self.get_bulk_url()
         bulk_response = self.build_click(bulk_api_url,extra_filter)
-        click_uri = str(bulk_response["uri"])
-        syc_response = self.syc_data(bulk_api_url,click_uri)
-        data_uri = syc_response["uri"]
-        return self.get_data(bulk_api_url,data_uri)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.get_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
 
-    def get_open_data(self,extra_filter = None):
+    def get_open_data(self,extra_filter = None,compact = None):
         """Método para buscar todos os dados de emails abertos  
 
             Parameters
@@ -484,6 +1298,9 @@ class EloquaInterface:
                 dicionario contendo os camps para serem filtrados como chave, 
                 e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
                 referencia:https://docs.oracle.com/cloud/latest/marketingcs_gs/OMCAB/Developers/BulkAPI/Tutorials/Filtering.htm    
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
             Returns
             -------
             list
@@ -495,19 +1312,21 @@ class EloquaInterface:
         logging.debug("Endereco da bulk: %s",bulk_api_url)
         logging.info("Construindo a url de exportacao da bulk API")
         bulk_response = self.build_open(bulk_api_url,extra_filter)
-        build_uri = str(bulk_response["uri"])
-        logging.debug("Endereço de exportacao: %s",build_uri)
-        logging.info("Iniciando a sincronizacao da API")
-        syc_response = self.syc_data(bulk_api_url,build_uri)
-        data_uri = syc_response["uri"]
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
         
-        return self.get_data(bulk_api_url,data_uri)
+        return self.get_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
 
-    def get_bounce_data(self):
+    def get_bounce_data(self,extra_filter = None,compact = None):
         """Método para buscar todos os dados de bounce  
 
             Parameters
             ----------       
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
             Returns
             -------
             list
@@ -516,17 +1335,13 @@ class EloquaInterface:
         logging.info('Inicio da busca dos dados')
         logging.info("Buscando a url da  bulk API")
         bulk_api_url = self.get_bulk_url()
-        bulk_response = self.build_bounce(bulk_api_url)
+        bulk_response = self.build_bounce(bulk_api_url,extra_filter)
         logging.debug("Endereco da bulk: %s",bulk_api_url)
         logging.info("Construindo a url de exportacao da bulk API")
-        build_uri = str(bulk_response["uri"])
-        logging.debug("Endereço de exportacao: %s",build_uri)
-        logging.info("Iniciando a sincronizacao da API")
-        syc_response = self.syc_data(bulk_api_url,build_uri)
-        data_uri = syc_response["uri"]
-        return self.get_data(bulk_api_url,data_uri)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.get_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
 
-    def get_sent_data(self,extra_filter = None):
+    def get_sent_data(self,extra_filter = None,compact = None):
         """Método para buscar todos os dados de emials enviados de uma dada campanha  
 
             Parameters
@@ -535,6 +1350,9 @@ class EloquaInterface:
                 dicionario contendo os camps para serem filtrados como chave, 
                 e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
                 referencia:https://docs.oracle.com/cloud/latest/marketingcs_gs/OMCAB/Developers/BulkAPI/Tutorials/Filtering.htm  
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
             Returns
             -------
             list
@@ -546,9 +1364,606 @@ class EloquaInterface:
         logging.debug("Endereco da bulk: %s",bulk_api_url)
         logging.info("Construindo a url de exportacao da bulk API")
         bulk_response = self.build_sent(bulk_api_url,extra_filter = extra_filter)
-        build_uri = str(bulk_response["uri"])
-        logging.debug("Endereço de exportacao: %s",build_uri)
-        logging.info("Iniciando a sincronizacao da API")
-        syc_response = self.syc_data(bulk_api_url,build_uri)
-        data_uri = syc_response["uri"]
-        return self.get_data(bulk_api_url,data_uri)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.get_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
+
+
+    def iter_click_data(self,extra_filter = None,compact = None):
+        """Gerador que devolve os dados de clique linha a linha, sem manter a exportação inteira em memória
+
+            Parameters
+            ----------  
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
+            Yields
+            -------
+            dict
+                uma linha dos dados de clique
+        """
+        bulk_api_url = self.get_bulk_url()
+        bulk_response = self.build_click(bulk_api_url,extra_filter)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.iter_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
+
+    def iter_open_data(self,extra_filter = None,compact = None):
+        """Gerador que devolve os dados de emails abertos linha a linha, sem manter a exportação inteira em memória
+
+            Parameters
+            ----------  
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
+            Yields
+            -------
+            dict
+                uma linha dos dados de emails abertos
+        """
+        bulk_api_url = self.get_bulk_url()
+        bulk_response = self.build_open(bulk_api_url,extra_filter)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.iter_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
+
+    def iter_bounce_data(self,extra_filter = None,compact = None):
+        """Gerador que devolve os dados de bounce linha a linha, sem manter a exportação inteira em memória
+
+            Parameters
+            ----------  
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
+            Yields
+            -------
+            dict
+                uma linha dos dados de bounce
+        """
+        bulk_api_url = self.get_bulk_url()
+        bulk_response = self.build_bounce(bulk_api_url,extra_filter)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.iter_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
+
+    def iter_sent_data(self,extra_filter = None,compact = None):
+        """Gerador que devolve os dados de emails enviados linha a linha, sem manter a exportação inteira em memória
+
+            Parameters
+            ----------  
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            compact : str
+                None para dicionários, 'record' para registros compactos ou 'tuple' para tuplas que compartilham
+                o cabeçalho (veja eloqua.rows). O padrão é None
+            Yields
+            -------
+            dict
+                uma linha dos dados de emails enviados
+        """
+        bulk_api_url = self.get_bulk_url()
+        bulk_response = self.build_sent(bulk_api_url,extra_filter = extra_filter)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.iter_data(bulk_api_url,data_uri,compact = compact,fields = bulk_response.get("fields"))
+
+    def _get_state(self,section,key):
+        """Método interno que lê um valor do estado local deste site, relendo state_path se houver, para ver
+        o que outros processos gravaram
+
+            Parameters
+            ----------
+            section : str
+                seção do estado (por exemplo 'watermarks')
+            key : str
+                chave dentro da seção
+            Returns
+            -------
+            valor gravado, ou None
+        """
+        if self.state_path is not None:
+            state = _load_json(self.state_path).get(self.site_name,{})
+            with self._state_lock:
+                self._state = state
+        return self._state.get(section,{}).get(key)
+
+    def _update_state(self,section,key,value):
+        """Método interno que grava um valor no estado local deste site, persistindo-o se houver state_path.
+        A gravação relê o arquivo sob uma trava entre processos e altera somente a chave informada, para não
+        descartar o que outras interfaces (de outros sites, threads ou processos) gravaram no mesmo arquivo
+
+            Parameters
+            ----------
+            section : str
+                seção do estado (por exemplo 'watermarks')
+            key : str
+                chave dentro da seção
+            value
+                valor a ser gravado, ou None para remover a chave
+        """
+        def apply(site_state):
+            if value is None:
+                site_state.get(section,{}).pop(key,None)
+            else:
+                site_state.setdefault(section,{})[key] = value
+
+        with self._state_lock:
+            if self.state_path is None:
+                apply(self._state)
+                return
+            with lock_for(self.state_path):
+                state = _load_json(self.state_path)
+                apply(state.setdefault(self.site_name,{}))
+                _dump_json(self.state_path,state)
+            self._state = state[self.site_name]
+
+    def get_watermark(self,activity_type):
+        """Método para adquirir a marca d'água da exportação incremental de um tipo de atividade
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            Returns
+            -------
+            dict
+                dicionário com ActivityDate e ActivityId da última atividade baixada, ou None se não houver
+        """
+        return self._get_state("watermarks",activity_type)
+
+    def set_watermark(self,activity_type,watermark):
+        """Método para alterar (ou, com None, apagar) a marca d'água de um tipo de atividade
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            watermark : dict
+                dicionário com ActivityDate e ActivityId
+        """
+        self._update_state("watermarks",activity_type,watermark)
+
+    def get_dedup_index(self,activity_type,bloom_capacity = None):
+        """Método para adquirir o índice de ActivityIds já exportados de um tipo de atividade deste site.
+        O índice é aberto uma única vez por instância e fica em dedup_path
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            bloom_capacity : int
+                número de IDs esperado; se informado, o índice usa um filtro de Bloom. Só tem efeito na
+                primeira chamada de cada tipo. O padrão é None (usa dedup_bloom_capacity)
+            Returns
+            -------
+            ActivityIndex
+                índice persistente do tipo de atividade
+        """
+        if self.dedup_path is None:
+            raise ValueError("A deduplicação requer dedup_path ou um ActivityIndex informado em dedup")
+        with self._dedup_lock:
+            if activity_type not in self._dedup_indexes:
+                os.makedirs(self.dedup_path,exist_ok=True)
+                path = os.path.join(self.dedup_path,"{}.{}.idx".format(self.site_name,activity_type))
+                if bloom_capacity is None:
+                    bloom_capacity = self.dedup_bloom_capacity
+                self._dedup_indexes[activity_type] = ActivityIndex(path,bloom_capacity = bloom_capacity)
+            return self._dedup_indexes[activity_type]
+
+    def _dedup_index(self,activity_type,dedup):
+        """Método interno que resolve o parâmetro dedup dos métodos de exportação
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            dedup : bool ou ActivityIndex
+                False, True (índice do site em dedup_path) ou um índice próprio
+            Returns
+            -------
+            ActivityIndex
+                índice a ser usado, ou None sem deduplicação
+        """
+        if not dedup:
+            return None
+        if isinstance(dedup,ActivityIndex):
+            return dedup
+        return self.get_dedup_index(activity_type)
+
+    def iter_incremental_data(self,activity_type,extra_filter = None,workers = 1,dedup = False):
+        """Gerador que devolve somente as atividades criadas depois da marca d'água do tipo de atividade.
+        A marca só avança quando todas as páginas foram baixadas.
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            workers : int
+                número de páginas baixadas em paralelo. O padrão é 1
+            dedup : bool ou ActivityIndex
+                descarta as atividades cujo ActivityId já está no índice (veja get_dedup_index); os IDs novos
+                só são confirmados no índice junto com a marca d'água. O padrão é False
+            Yields
+            -------
+            dict
+                uma linha com uma atividade nova
+        """
+        index = self._dedup_index(activity_type,dedup)
+        watermark = self.get_watermark(activity_type)
+        incremental_filter = dict(extra_filter or {})
+        if watermark is not None:
+            # usamos >= e descartamos abaixo as atividades já baixadas da mesma data, pois várias podem compartilhar o instante
+            incremental_filter["{{Activity.CreatedAt}}"] = list(incremental_filter.get("{{Activity.CreatedAt}}",[])) + \
+                [{"op": ">=", "value": watermark["ActivityDate"]}]
+            last = (watermark["ActivityDate"],int(watermark["ActivityId"]))
+        bulk_api_url = self.get_bulk_url()
+        # com a marca d'água o filtro muda a cada execução, então a definição não é guardada para reutilização
+        bulk_response = self.build_activity(bulk_api_url,activity_type,incremental_filter or None,cache = watermark is None)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        newest = None
+        try:
+            for page in self.iter_pages(bulk_api_url,data_uri,workers = workers):
+                if index is not None:
+                    page = index.filter_page(page)
+                for row in page:
+                    mark = (row["ActivityDate"],int(row["ActivityId"]))
+                    if watermark is not None and mark <= last:
+                        continue
+                    if newest is None or mark > newest:
+                        newest = mark
+                    yield row
+        except BaseException:
+            if index is not None:
+                index.discard()
+            raise
+        if newest is not None:
+            self.set_watermark(activity_type,{"ActivityDate": newest[0], "ActivityId": newest[1]})
+        if index is not None:
+            index.commit()
+
+    def get_incremental_data(self,activity_type,extra_filter = None,workers = 1,dedup = False):
+        """Método para buscar somente as atividades criadas desde a última execução, avançando a marca d'água
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            workers : int
+                número de páginas baixadas em paralelo. O padrão é 1
+            dedup : bool ou ActivityIndex
+                descarta as atividades cujo ActivityId já está no índice (veja get_dedup_index). O padrão é False
+            Returns
+            -------
+            list
+                lista com as atividades novas
+        """
+        return list(self.iter_incremental_data(activity_type,extra_filter = extra_filter,workers = workers,dedup = dedup))
+
+    def _window_filter(self,extra_filter,window_start,window_end):
+        """Método interno que adiciona a janela de tempo [window_start, window_end) ao filtro extra
+
+            Parameters
+            ----------
+            extra_filter : dict
+                filtro extra informado pelo usuário, ou None
+            window_start : datetime.datetime
+                início da janela (inclusivo)
+            window_end : datetime.datetime
+                fim da janela (exclusivo)
+            Returns
+            -------
+            dict
+                novo filtro extra, no formato de _add_filters
+        """
+        window_filter = dict(extra_filter or {})
+        window_filter["{{Activity.CreatedAt}}"] = list(window_filter.get("{{Activity.CreatedAt}}",[])) + [
+            {"op": ">=", "value": window_start.strftime(self.date_format)},
+            {"op": "<", "value": window_end.strftime(self.date_format)},
+        ]
+        return window_filter
+
+    def get_sharded_data(self,activity_type,start,end,shard_size = datetime.timedelta(days=1),extra_filter = None,
+                         workers = 4,page_workers = 1,dedup = False):
+        """Método para exportar um período longo dividido em janelas de tempo. Cada janela vira uma exportação
+        filtrada própria; no máximo workers janelas ficam em andamento no Eloqua ao mesmo tempo, e cada janela é
+        baixada assim que a sua sincronização termina, liberando espaço para a próxima.
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            start : datetime.datetime
+                início do período (inclusivo)
+            end : datetime.datetime
+                fim do período (exclusivo)
+            shard_size : datetime.timedelta
+                tamanho de cada janela. O padrão é um dia
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            workers : int
+                número máximo de janelas em andamento (construção, sincronização e download). O padrão é 4
+            page_workers : int
+                número de páginas baixadas em paralelo dentro de cada janela. O padrão é 1
+            dedup : bool ou ActivityIndex
+                descarta as atividades repetidas entre janelas sobrepostas e as já exportadas em execuções
+                anteriores (veja get_dedup_index). O padrão é False
+            Returns
+            -------
+            list
+                lista com os dados de todas as janelas, na ordem das janelas
+        """
+        if shard_size <= datetime.timedelta(0):
+            raise ValueError("shard_size deve ser positivo: {}".format(shard_size))
+        index = self._dedup_index(activity_type,dedup)
+        windows = []
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + shard_size,end)
+            windows.append((window_start,window_end))
+            window_start = window_end
+        if not windows:
+            return []
+        bulk_api_url = self.get_bulk_url()
+
+        def export_window(window):
+            window_filter = self._window_filter(extra_filter,window[0],window[1])
+            # os filtros das janelas são de uso único e não são guardados para reutilização
+            data_uri = self._start_sync(bulk_api_url,self.build_activity(bulk_api_url,activity_type,window_filter,cache = False))
+            self._wait_sync(bulk_api_url,data_uri)
+            logging.info("Janela pronta, iniciando download: %s",data_uri)
+            return self.get_data(bulk_api_url,data_uri,page_workers,wait = False)
+
+        # cada thread leva uma janela do início ao download, então a próxima janela só é criada no Eloqua
+        # quando uma das anteriores termina
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            data = []
+            try:
+                for rows in executor.map(export_window,windows):
+                    data.extend(index.filter_page(rows) if index is not None else rows)
+            except BaseException:
+                if index is not None:
+                    index.discard()
+                raise
+        if index is not None:
+            index.commit()
+        return data
+
+    def get_activity_columns(self,activity_type,extra_filter = None,backend = 'numpy',parquet_path = None,workers = 1):
+        """Método para exportar um tipo de atividade em formato colunar. As páginas são convertidas em colunas
+        tipadas conforme chegam, com ActivityDate como datetime64 e os IDs como inteiros.
+        Requer numpy (backend 'numpy') ou pyarrow (backend 'arrow' e parquet_path)
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            backend : str
+                'numpy' para um dicionário de arrays, ou 'arrow' para uma pyarrow.Table. O padrão é 'numpy'
+            parquet_path : str
+                se informado, as páginas são gravadas direto neste arquivo parquet. O padrão é None
+            workers : int
+                número de páginas baixadas em paralelo. O padrão é 1
+            Returns
+            -------
+            dict, pyarrow.Table ou int
+                as colunas no backend escolhido, ou o número de linhas gravadas se parquet_path for informado
+        """
+        # importado aqui para que numpy e pyarrow só sejam carregados quando o formato colunar for usado
+        from .columnar import to_columns, write_parquet
+        bulk_api_url = self.get_bulk_url()
+        bulk_response = self.build_activity(bulk_api_url,activity_type,extra_filter)
+        # as colunas vêm do mapeamento fields da exportação, para manter a mesma ordem em todas as páginas
+        columns = list(bulk_response["fields"].keys()) if "fields" in bulk_response else None
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        pages = self.iter_pages(bulk_api_url,data_uri,workers = workers)
+        if parquet_path is not None:
+            return write_parquet(pages,parquet_path,columns = columns)
+        return to_columns(pages,columns = columns,backend = backend)
+
+    def export_to_sink(self,url,data_uri,sink,workers = 1,dedup_index = None):
+        """Método para gravar os dados de uma sincronização direto num destino em disco, página a página.
+        O arquivo final só aparece se todas as páginas forem gravadas
+
+            Parameters
+            ----------
+            url : str
+                url da bulk api para este usuário
+            data_uri : str
+                uri do dado a ser exportado
+            sink : ExportSink ou str
+                destino (NDJSONSink, CSVSink, ...) ou caminho do arquivo, cujo formato é escolhido pela extensão
+            workers : int
+                número de páginas baixadas em paralelo. O padrão é 1
+            dedup_index : ActivityIndex
+                índice usado para descartar as atividades já exportadas. Os IDs novos só são confirmados
+                no índice se o arquivo for gravado por completo. O padrão é None
+            Returns
+            -------
+            dict
+                estatísticas da gravação (path, rows, bytes_written e bytes_on_disk)
+        """
+        if isinstance(sink,str):
+            sink = sink_for_path(sink)
+        try:
+            with sink:
+                for page in self.iter_pages(url,data_uri,workers = workers):
+                    if dedup_index is not None:
+                        page = dedup_index.filter_page(page)
+                    sink.write_page(page)
+        except BaseException:
+            if dedup_index is not None:
+                dedup_index.discard()
+            raise
+        if dedup_index is not None:
+            dedup_index.commit()
+        logging.info("Exportacao gravada: %s",sink.stats())
+        return sink.stats()
+
+    def export_activity(self,activity_type,sink,extra_filter = None,workers = 1,dedup = False):
+        """Método para exportar um tipo de atividade direto num destino em disco
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            sink : ExportSink ou str
+                destino (NDJSONSink, CSVSink, ...) ou caminho do arquivo, cujo formato é escolhido pela extensão
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            workers : int
+                número de páginas baixadas em paralelo. O padrão é 1
+            dedup : bool ou ActivityIndex
+                descarta as atividades cujo ActivityId já está no índice (veja get_dedup_index). O padrão é False
+            Returns
+            -------
+            dict
+                estatísticas da gravação (path, rows, bytes_written e bytes_on_disk)
+        """
+        index = self._dedup_index(activity_type,dedup)
+        bulk_api_url = self.get_bulk_url()
+        bulk_response = self.build_activity(bulk_api_url,activity_type,extra_filter)
+        if isinstance(sink,str):
+            # no csv, as colunas seguem a ordem do mapeamento fields da exportação
+            sink = sink_for_path(sink,columns = list(bulk_response["fields"].keys()) if "fields" in bulk_response else None)
+        data_uri = self._start_sync(bulk_api_url,bulk_response)
+        return self.export_to_sink(bulk_api_url,data_uri,sink,workers = workers,dedup_index = index)
+
+    def export_activity_resumable(self,activity_type,path,job = None,extra_filter = None,workers = 1):
+        """Método para exportar um tipo de atividade para um arquivo com checkpoints. Depois de cada página gravada,
+        a uri da sincronização, o próximo offset e a posição do arquivo são salvos no estado local (state_path).
+        Se o processo morrer, uma nova chamada com o mesmo job continua do último offset salvo, usando a mesma
+        sincronização enquanto ela continuar válida no Eloqua.
+
+            Parameters
+            ----------
+            activity_type : str
+                tipo de atividade ('click', 'open', 'sent' ou 'bounce')
+            path : str
+                caminho do arquivo, cujo formato é escolhido pela extensão (.ndjson, .csv, .gz, .zst)
+            job : str
+                nome do checkpoint. O padrão é None ('tipo de atividade:path')
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado 
+            workers : int
+                número de páginas baixadas em paralelo; as páginas continuam sendo gravadas na ordem. O padrão é 1
+            Returns
+            -------
+            dict
+                estatísticas da gravação (path, rows, bytes_written e bytes_on_disk)
+        """
+        job = job if job is not None else "{}:{}".format(activity_type,path)
+        tmp_path = path + ".partial"
+        # o checkpoint só vale para a mesma exportação: outro filtro no mesmo job começa uma sincronização nova
+        canonical = json.dumps({"activity_type": activity_type,"filter": extra_filter},sort_keys=True,separators=(',',':'),default=str)
+        export = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        bulk_api_url = self.get_bulk_url()
+        checkpoint = self._get_state("checkpoints",job)
+        if checkpoint is not None and checkpoint.get("export") != export:
+            logging.info("Checkpoint de %s descartado, a exportacao mudou",job)
+            checkpoint = None
+        if checkpoint is not None:
+            try:
+                status = self.check_data(bulk_api_url,checkpoint["data_uri"]).get("status")
+            except EloquaRequestException:
+                status = None
+            if status != "success" or checkpoint["path"] != path:
+                logging.info("Checkpoint de %s descartado, a sincronizacao nao e mais valida",job)
+                checkpoint = None
+        if checkpoint is not None:
+            data_uri = checkpoint["data_uri"]
+            columns = checkpoint["columns"]
+            if os.path.exists(tmp_path):
+                start_offset = checkpoint["offset"]
+                position = checkpoint["position"]
+            else:
+                # sem o arquivo parcial, relemos a mesma sincronização desde o início
+                start_offset = 0
+                position = None
+            logging.info("Retomando %s a partir do offset %s",job,start_offset)
+        else:
+            bulk_response = self.build_activity(bulk_api_url,activity_type,extra_filter)
+            columns = list(bulk_response["fields"].keys()) if "fields" in bulk_response else None
+            data_uri = self._start_sync(bulk_api_url,bulk_response)
+            start_offset = 0
+            position = None
+        sink = sink_for_path(path,columns = columns,tmp_path = tmp_path)
+        sink.open(position)
+
+        def save(offset):
+            self._update_state("checkpoints",job,{"data_uri": data_uri,"export": export,"path": path,"columns": getattr(sink,"columns",columns),
+                                                  "offset": offset,"position": sink.checkpoint()})
+
+        offset = start_offset
+        try:
+            save(offset)
+            for page in self.iter_pages(bulk_api_url,data_uri,workers = workers,start_offset = start_offset):
+                sink.write_page(page)
+                offset += self.page_limit
+                save(offset)
+        except BaseException:
+            # mantém o arquivo parcial e o checkpoint para a próxima execução
+            sink.suspend()
+            raise
+        stats = sink.close()
+        self._update_state("checkpoints",job,None)
+        logging.info("Exportacao gravada: %s",stats)
+        return stats
+
+    def get_activities(self,types = ("click","open","sent","bounce"),extra_filter = None,workers = None,page_workers = 1):
+        """Método para buscar vários tipos de atividade numa única chamada. Todas as exportações são construídas
+        e sincronizadas logo no início, e cada uma é baixada assim que sua sincronização termina, de modo que o
+        tempo total fica próximo ao da exportação mais lenta
+
+            Parameters
+            ----------
+            types : list
+                tipos de atividade ('click', 'open', 'sent' e/ou 'bounce'). O padrão são os quatro
+            extra_filter
+                dicionario contendo os camps para serem filtrados como chave, 
+                e como valor possuem outro dicionario, contendo o operador e o valor em si a ser filtrado.
+                É aplicado a todos os tipos
+            workers : int
+                número de exportações construídas e baixadas ao mesmo tempo. O padrão é None (uma por tipo)
+            page_workers : int
+                número de páginas baixadas em paralelo dentro de cada exportação. O padrão é 1
+            Returns
+            -------
+            dict
+                dicionário com o tipo de atividade como chave e a lista de dados como valor
+        """
+        types = list(types)
+        for activity_type in types:
+            if activity_type not in self.activity_builders:
+                raise ValueError("Tipo de atividade desconhecido: {}".format(activity_type))
+        if not types:
+            return {}
+        bulk_api_url = self.get_bulk_url()
+
+        def start(activity_type):
+            return self._start_sync(bulk_api_url,self.build_activity(bulk_api_url,activity_type,extra_filter))
+
+        with ThreadPoolExecutor(max_workers=workers or len(types)) as executor:
+            data_uris = list(executor.map(start,types))
+            types_by_uri = dict(zip(data_uris,types))
+            downloads = {}
+            for data_uri,_ in self.wait_syncs(bulk_api_url,data_uris):
+                logging.info("Exportacao de %s pronta, iniciando download",types_by_uri[data_uri])
+                downloads[types_by_uri[data_uri]] = executor.submit(self.get_data,bulk_api_url,data_uri,page_workers,wait = False)
+            return {activity_type: downloads[activity_type].result() for activity_type in types}
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Trava exclusiva entre processos (e entre threads) baseada num arquivo, usada para proteger os arquivos
+locais compartilhados, como o estado das exportações e os índices de deduplicação.
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Trava exclusiva sobre o arquivo path. Usada como gerenciador de contexto; cada entrada abre o arquivo
+    de novo, então duas threads do mesmo processo também se excluem.
+    """
+
+    def __init__(self,path):
+        """Construtor da trava
+
+            Parameters
+            ----------
+            path : str
+                caminho do arquivo de trava, criado se não existir
+
+        """
+        self.path = path
+        self._handle = None
+
+    def acquire(self,blocking = True):
+        """Método que obtém a trava
+
+            Parameters
+            ----------
+            blocking : bool
+                espera a trava ser liberada; se False, desiste na hora. O padrão é True
+            Returns
+            -------
+            bool
+                True se a trava foi obtida
+        """
+        handle = open(self.path,'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(),fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(),msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK,1)
+        except OSError:
+            handle.close()
+            if blocking:
+                raise
+            return False
+        self._handle = handle
+        return True
+
+    def release(self):
+        handle,self._handle = self._handle,None
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(),fcntl.LOCK_UN)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(),msvcrt.LK_UNLCK,1)
+        handle.close()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def lock_for(path):
+    """Função que devolve a trava de um arquivo compartilhado, guardada em path + '.lock'
+
+        Parameters
+        ----------
+        path : str
+            caminho do arquivo protegido
+        Returns
+        -------
+        FileLock
+            trava do arquivo
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory,exist_ok=True)
+    return FileLock(path + ".lock")
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas das requisições ao Eloqua, agregadas por fase (discover, build, sync, poll, download, campaigns),
+com hooks para callbacks e exportadores no formato do Prometheus e do statsd.
+"""
+
+import re
+import socket
+import datetime
+import threading
+from collections import deque
+
+
+# fases em que as requisições da EloquaInterface são classificadas
+PHASES = ("discover", "build", "sync", "poll", "download", "campaigns")
+
+
+def parse_timestamp(value):
+    """Função que converte uma data ISO 8601 do Eloqua (como 2014-01-01T13:59:07.1375620Z) para datetime
+
+        Parameters
+        ----------
+        value : str
+            data no formato ISO 8601
+        Returns
+        -------
+        datetime.datetime
+            data convertida, ou None se não for possível converter
+    """
+    if not value:
+        return None
+    try:
+        # antes do Python 3.11, fromisoformat só aceita frações de 3 ou 6 dígitos, e o Eloqua envia 7
+        value = re.sub(r"\.(\d+)",lambda match: "." + match.group(1)[:6].ljust(6,"0"),value,count=1)
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Metrics:
+    """Acumula as métricas de uma interface e repassa cada evento para os hooks registrados.
+
+    Os eventos são dicionários com a chave type ('request', 'decode', 'rows', 'retry' ou 'sync'), a fase e os valores
+    medidos. A instância é segura para uso por várias threads.
+    """
+
+    def __init__(self,max_syncs = 1000):
+        """Construtor das métricas
+
+            Parameters
+            ----------
+            max_syncs : int
+                número de sincronizações recentes guardadas com seus tempos. O padrão é 1000
+
+        """
+        self._lock = threading.Lock()
+        self._hooks = []
+        self._phases = {}
+        self.syncs = deque(maxlen=max_syncs)
+
+    def add_hook(self,hook):
+        """Método para registrar um callback chamado a cada evento
+
+            Parameters
+            ----------
+            hook : callable
+                função que recebe o dicionário do evento
+        """
+        self._hooks.append(hook)
+
+    def _phase(self,phase):
+        """Método interno que devolve os acumuladores de uma fase (deve ser chamado com o lock)
+        """
+        if phase not in self._phases:
+            self._phases[phase] = {"requests": 0,"errors": 0,"latency_total": 0.0,"latency_max": 0.0,
+                                   "bytes": 0,"decode_total": 0.0,"rows": 0,"retries": 0}
+        return self._phases[phase]
+
+    def _emit(self,event):
+        for hook in self._hooks:
+            hook(event)
+
+    def record_request(self,phase,method,url,status,latency,size = 0):
+        """Método para registrar uma requisição
+
+            Parameters
+            ----------
+            phase : str
+                fase da requisição
+            method : str
+                método http
+            url : str
+                endereço da requisição
+            status : int
+                status http, ou None em falha de conexão
+            latency : float
+                duração, em segundos, incluindo as novas tentativas
+            size : int
+                bytes recebidos. O padrão é 0
+        """
+        with self._lock:
+            acc = self._phase(phase)
+            acc["requests"] += 1
+            if status is None or status >= 400:
+                acc["errors"] += 1
+            acc["latency_total"] += latency
+            acc["latency_max"] = max(acc["latency_max"],latency)
+            acc["bytes"] += size
+        self._emit({"type": "request","phase": phase,"method": method,"url": url,"status": status,
+                    "latency": latency,"bytes": size})
+
+    def record_decode(self,phase,seconds):
+        """Método para registrar o tempo gasto decodificando o json de uma resposta
+
+            Parameters
+            ----------
+            phase : str
+                fase da requisição
+            seconds : float
+                duração da decodificação, em segundos
+        """
+        with self._lock:
+            self._phase(phase)["decode_total"] += seconds
+        self._emit({"type": "decode","phase": phase,"seconds": seconds})
+
+    def record_rows(self,phase,rows):
+        """Método para registrar linhas decodificadas
+
+            Parameters
+            ----------
+            phase : str
+                fase em que as linhas foram decodificadas
+            rows : int
+                número de linhas
+        """
+        with self._lock:
+            self._phase(phase)["rows"] += rows
+        self._emit({"type": "rows","phase": phase,"rows": rows})
+
+    def record_retry(self,phase,status = None):
+        """Método para registrar uma nova tentativa
+
+            Parameters
+            ----------
+            phase : str
+                fase da requisição repetida
+            status : int
+                status http que causou a nova tentativa, ou None em falha de conexão
+        """
+        with self._lock:
+            self._phase(phase)["retries"] += 1
+        self._emit({"type": "retry","phase": phase,"status": status})
+
+    def record_sync(self,data_uri,status_response,wait_time):
+        """Método para registrar uma sincronização concluída. Os tempos de fila e de processamento vêm dos
+        campos createdAt, syncStartedAt e syncEndedAt da resposta de status, quando presentes
+
+            Parameters
+            ----------
+            data_uri : str
+                uri da sincronização
+            status_response : dict
+                última resposta de status da sincronização
+            wait_time : float
+                segundos que o cliente aguardou a sincronização
+        """
+        created = parse_timestamp(status_response.get("createdAt"))
+        started = parse_timestamp(status_response.get("syncStartedAt"))
+        ended = parse_timestamp(status_response.get("syncEndedAt"))
+        sync = {"uri": data_uri,"status": status_response.get("status"),"wait_time": wait_time,
+                "queue_time": (started - created).total_seconds() if created and started else None,
+                "processing_time": (ended - started).total_seconds() if started and ended else None}
+        with self._lock:
+            self.syncs.append(sync)
+        self._emit(dict(sync,type="sync",phase="poll"))
+
+    def snapshot(self):
+        """Método para adquirir uma cópia das métricas acumuladas
+
+            Returns
+            -------
+            dict
+                dicionário com uma entrada por fase (requests, errors, latency_total, latency_max, bytes,
+                decode_total, rows e retries) e a lista syncs com os tempos das sincronizações recentes
+        """
+        with self._lock:
+            phases = {phase: dict(values) for phase,values in self._phases.items()}
+            return {"phases": phases,"syncs": list(self.syncs)}
+
+    def to_prometheus(self,prefix = "eloqua",labels = None):
+        """Método que formata as métricas acumuladas no formato texto do Prometheus
+
+            Parameters
+            ----------
+            prefix : str
+                prefixo dos nomes das métricas. O padrão é 'eloqua'
+            labels : dict
+                labels extras, por exemplo {'site': 'empresa'}. O padrão é None
+            Returns
+            -------
+            str
+                texto pronto para ser servido no endpoint /metrics
+        """
+        snapshot = self.snapshot()
+        extra = "".join(',{}="{}"'.format(key,value) for key,value in sorted((labels or {}).items()))
+        metrics = [("requests_total","counter","requests"),("errors_total","counter","errors"),
+                   ("request_seconds_total","counter","latency_total"),("request_seconds_max","gauge","latency_max"),
+                   ("bytes_total","counter","bytes"),("decode_seconds_total","counter","decode_total"),
+                   ("rows_total","counter","rows"),("retries_total","counter","retries")]
+        lines = []
+        for name,kind,key in metrics:
+            lines.append("# TYPE {}_{} {}".format(prefix,name,kind))
+            for phase,values in sorted(snapshot["phases"].items()):
+                lines.append('{}_{}{{phase="{}"{}}} {}'.format(prefix,name,phase,extra,values[key]))
+        return "\n".join(lines) + "\n"
+
+
+class StatsdExporter:
+    """Hook que envia cada evento para um servidor statsd via UDP. Use com Metrics.add_hook.
+    """
+
+    def __init__(self,host = "127.0.0.1",port = 8125,prefix = "eloqua"):
+        """Construtor do exportador
+
+            Parameters
+            ----------
+            host : str
+                endereço do statsd. O padrão é 127.0.0.1
+            port : int
+                porta do statsd. O padrão é 8125
+            prefix : str
+                prefixo dos nomes das métricas. O padrão é 'eloqua'
+
+        """
+        self.address = (host,port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET,socket.SOCK_DGRAM)
+
+    def __call__(self,event):
+        phase = event.get("phase")
+        kind = event["type"]
+        if kind == "request":
+            lines = ["{}.{}.request:{:.3f}|ms".format(self.prefix,phase,event["latency"]*1000),
+                     "{}.{}.bytes:{}|c".format(self.prefix,phase,event["bytes"])]
+            if event["status"] is None or event["status"] >= 400:
+                lines.append("{}.{}.errors:1|c".format(self.prefix,phase))
+        elif kind == "decode":
+            lines = ["{}.{}.decode:{:.3f}|ms".format(self.prefix,phase,event["seconds"]*1000)]
+        elif kind == "rows":
+            lines = ["{}.{}.rows:{}|c".format(self.prefix,phase,event["rows"])]
+        elif kind == "retry":
+            lines = ["{}.{}.retries:1|c".format(self.prefix,phase)]
+        else:
+            lines = ["{}.sync.wait:{:.3f}|ms".format(self.prefix,event["wait_time"]*1000)]
+            for key in ("queue_time","processing_time"):
+                if event[key] is not None:
+                    lines.append("{}.sync.{}:{:.3f}|ms".format(self.prefix,key,event[key]*1000))
+        try:
+            self._socket.sendto("\n".join(lines).encode("utf-8"),self.address)
+        except OSError:
+            # métricas nunca devem interromper uma exportação
+            pass
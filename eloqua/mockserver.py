@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita os endpoints do Eloqua usados pela EloquaInterface, para testes e benchmarks
+sem acesso à instância de produção.
+
+Exemplo
+-------
+    with MockEloquaServer(rows=200000,sync_duration=2) as server:
+        eloqua = EloquaInterface('site','user','password')
+        eloqua.login_url = server.login_url
+        data = eloqua.get_click_data()
+"""
+
+import re
+import json
+import time
+import random
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self,status,content = None,headers = None):
+        body = json.dumps(content).encode('utf-8') if content is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type","application/json")
+        self.send_header("Content-Length",str(len(body)))
+        for key,value in (headers or {}).items():
+            self.send_header(key,value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self,method):
+        server = self.server.mock
+        parsed = urlparse(self.path)
+        # a bulk api aceita barras duplicadas, como em .../2.0/ + /syncs/1
+        path = re.sub("/+","/",parsed.path)
+        query = {key: values[0] for key,values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        server.count(method,path)
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            status = random.choice([429,503])
+            return self._send(status,{"error": "erro injetado"},{"Retry-After": "0"} if status == 429 else None)
+        status,content = server.route(method,path,query,data)
+        self._send(status,content)
+
+    def do_GET(self):
+        self._handle('get')
+
+    def do_POST(self):
+        self._handle('post')
+
+
+class MockEloquaServer:
+    """Servidor http local que implementa /id, assets/campaigns, activities/exports, syncs, /logs e
+    /data?limit&offset, com latência, duração das sincronizações, número de linhas e injeção de erros configuráveis.
+    """
+
+    def __init__(self,rows = 100000,campaigns = 1200,sync_duration = 0.5,latency = 0,error_rate = 0,
+                 host = "127.0.0.1",port = 0):
+        """Construtor do servidor
+
+            Parameters
+            ----------
+            rows : int
+                número de linhas devolvidas por cada exportação. O padrão é 100000
+            campaigns : int
+                número de campanhas em assets/campaigns. O padrão é 1200
+            sync_duration : float
+                segundos até uma sincronização passar de pending para success. O padrão é 0.5
+            latency : float
+                segundos de espera adicionados a cada requisição. O padrão é 0
+            error_rate : float
+                fração das requisições respondidas com 429 ou 503. O padrão é 0
+            host : str
+                endereço de escuta. O padrão é 127.0.0.1
+            port : int
+                porta de escuta. O padrão é 0 (uma porta livre)
+
+        """
+        self.rows = rows
+        self.campaigns = campaigns
+        self.sync_duration = sync_duration
+        self.latency = latency
+        self.error_rate = error_rate
+        self.request_counts = {}
+        self.campaign_updates = {}
+        self._exports = {}
+        self._syncs = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host,port),_MockHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return "http://{}:{}".format(*self._httpd.server_address[:2])
+
+    @property
+    def login_url(self):
+        """Endereço a ser usado em EloquaInterface.login_url"""
+        return self.base_url + "/id"
+
+    def start(self):
+        """Método para iniciar o servidor numa thread em segundo plano
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever,daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Método para parar o servidor
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def count(self,method,path):
+        """Método para contabilizar uma requisição pelo tipo de endpoint
+        """
+        if path == "/id":
+            endpoint = "id"
+        elif path.endswith("/data"):
+            endpoint = "data"
+        elif path.endswith("/logs"):
+            endpoint = "logs"
+        elif "/syncs" in path:
+            endpoint = "syncs" if method == 'post' else "sync_status"
+        elif "/activities/exports" in path:
+            endpoint = "exports"
+        elif "/assets/campaigns" in path:
+            endpoint = "campaigns"
+        else:
+            endpoint = "other"
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint,0) + 1
+
+    def route(self,method,path,query,data):
+        """Método que despacha uma requisição para o endpoint correspondente
+
+            Returns
+            -------
+            tuple
+                (status http, conteúdo json)
+        """
+        if path == "/id":
+            return 200,{"site": {"name": "mock"},"urls": {"apis": {"rest": {
+                "standard": self.base_url + "/api/rest/{version}/",
+                "bulk": self.base_url + "/api/bulk/{version}/"}}}}
+        if path == "/api/rest/2.0/assets/campaigns":
+            return self._campaigns(int(query.get("count",1000)),int(query.get("page",1)),query.get("search"))
+        if not path.startswith("/api/bulk/2.0"):
+            return 404,{"error": "not found"}
+        uri = path[len("/api/bulk/2.0"):]
+        if uri == "/activities/exports" and method == 'post':
+            return self._create_export(data)
+        if uri == "/syncs" and method == 'post':
+            return self._create_sync(data)
+        if uri.startswith("/syncs/"):
+            parts = uri.split("/")
+            sync_uri = "/".join(parts[:3])
+            if sync_uri not in self._syncs:
+                return 404,{"error": "sync not found"}
+            if len(parts) == 3:
+                return 200,self._sync_status(sync_uri)
+            if parts[3] == "logs":
+                return 200,{"items": [{"message": "mock", "count": self.rows}],"totalResults": 1}
+            if parts[3] == "data":
+                return self._data(sync_uri,int(query.get("limit",50000)),int(query.get("offset",0)))
+        return 404,{"error": "not found"}
+
+    def _campaigns(self,count,page,search = None):
+        updated_at = lambda i: 1500000000 + i + self.campaign_updates.get(i+1,0)
+        indexes = range(self.campaigns)
+        if search:
+            # somente a busca usada pela atualização incremental: updatedAt>='segundos'
+            match = re.match(r"updatedAt>='?(\d+)'?$",search)
+            if match is None:
+                return 400,{"error": "search not supported"}
+            indexes = [i for i in indexes if updated_at(i) >= int(match.group(1))]
+        start = (page-1)*count
+        elements = [{"type": "Campaign","id": str(i+1),"name": "Campaign {}".format(i+1),
+                     "updatedAt": str(updated_at(i))}
+                    for i in indexes[start:start+count]]
+        return 200,{"elements": elements,"page": page,"pageSize": count,"total": len(indexes)}
+
+    def touch_campaign(self,campaign_id,seconds = 10**6):
+        """Método que simula a alteração de uma campanha, avançando o seu updatedAt
+        """
+        with self._lock:
+            self.campaign_updates[int(campaign_id)] = self.campaign_updates.get(int(campaign_id),0) + seconds
+
+    def _create_export(self,data):
+        with self._lock:
+            uri = "/activities/exports/{}".format(len(self._exports)+1)
+            self._exports[uri] = dict(data,uri=uri)
+        return 201,self._exports[uri]
+
+    def _create_sync(self,data):
+        export_uri = data.get("syncedInstanceUri")
+        if export_uri not in self._exports:
+            return 400,{"error": "export not found"}
+        with self._lock:
+            uri = "/syncs/{}".format(len(self._syncs)+1)
+            self._syncs[uri] = {"uri": uri,"syncedInstanceUri": export_uri,"created": time.time()}
+        return 201,self._sync_status(uri)
+
+    def _sync_status(self,uri):
+        sync = self._syncs[uri]
+        elapsed = time.time() - sync["created"]
+        if elapsed >= self.sync_duration:
+            status = "success"
+        elif elapsed >= self.sync_duration/2:
+            status = "active"
+        else:
+            status = "pending"
+        response = {"uri": uri,"syncedInstanceUri": sync["syncedInstanceUri"],"status": status,
+                    "createdAt": self._timestamp(sync["created"])}
+        if status != "pending":
+            response["syncStartedAt"] = self._timestamp(sync["created"] + self.sync_duration/2)
+        if status == "success":
+            response["syncEndedAt"] = self._timestamp(sync["created"] + self.sync_duration)
+        return response
+
+    def _timestamp(self,seconds):
+        # o Eloqua envia sete dígitos de fração de segundo (2014-01-01T13:59:07.1375620Z)
+        return datetime.datetime.fromtimestamp(seconds,datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f") + "0Z"
+
+    def _data(self,sync_uri,limit,offset):
+        fields = self._exports[self._syncs[sync_uri]["syncedInstanceUri"]].get("fields",{})
+        items = [self._row(fields,i) for i in range(offset,min(offset+limit,self.rows))]
+        return 200,{"totalResults": self.rows,"limit": limit,"offset": offset,"count": len(items),
+                    "hasMore": offset+len(items) < self.rows,"items": items}
+
+    def _row(self,fields,index):
+        """Método interno que gera uma linha determinística a partir do mapeamento fields da exportação
+        """
+        base = datetime.datetime(2020,1,1) + datetime.timedelta(seconds=index)
+        row = {}
+        for name in fields:
+            if name == "ActivityId":
+                row[name] = str(index+1)
+            elif name == "ActivityDate":
+                row[name] = base.strftime("%Y-%m-%d %H:%M:%S.000")
+            elif name in ("ContactId","AssetId","CampaignId","VisitorId","DeploymentId"):
+                row[name] = str(index % 997 + 1)
+            elif name == "EmailAddress":
+                row[name] = "contact{}@example.com".format(index % 5003)
+            else:
+                row[name] = "{} {}".format(name,index % 13)
+        return row
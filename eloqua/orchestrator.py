@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Orquestrador de exportações para vários sites (instâncias) do Eloqua, distribuindo os jobs num pool de
+threads ou de processos com limite de jobs simultâneos por site e escalonamento justo entre os sites.
+
+Exemplo
+-------
+    sites = [{"site_name": "cliente_a","user_name": "api","password": "..."},
+             {"site_name": "cliente_b","user_name": "api","password": "...","max_jobs": 2}]
+    jobs = [{"site": site["site_name"],"activity_type": activity_type,"path": "saida/{site}/{activity_type}.csv.gz"}
+            for site in sites for activity_type in ("click","open")]
+    with Orchestrator(sites,max_workers = 8,per_site = 1) as orchestrator:
+        results = orchestrator.run(jobs)
+"""
+
+import os
+import time
+import pickle
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .eloquainterface import EloquaInterface
+
+
+def _export(interface,job):
+    """Função interna que executa um job numa interface já criada
+
+        Parameters
+        ----------
+        interface : EloquaInterface
+            interface do site do job
+        job : dict
+            job com activity_type, path e, opcionalmente, extra_filter, workers, resumable e dedup
+        Returns
+        -------
+        dict
+            estatísticas da gravação (path, rows, bytes_written e bytes_on_disk)
+    """
+    path = job["path"].format(site = interface.site_name,activity_type = job["activity_type"])
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory,exist_ok=True)
+    if job.get("resumable"):
+        return interface.export_activity_resumable(job["activity_type"],path,extra_filter = job.get("extra_filter"),
+                                                   workers = job.get("workers",1))
+    return interface.export_activity(job["activity_type"],path,extra_filter = job.get("extra_filter"),
+                                     workers = job.get("workers",1),dedup = job.get("dedup",False))
+
+
+def _run_job(credentials,options,job):
+    """Função interna executada nos processos do pool: cria a interface do site, executa o job e a fecha.
+    Um erro que não pode ser serializado é trocado por um RuntimeError com a sua descrição, pois do contrário
+    o pool inteiro seria interrompido
+    """
+    try:
+        with EloquaInterface(credentials["site_name"],credentials["user_name"],credentials["password"],**options) as interface:
+            return _export(interface,job)
+    except Exception as exc:
+        try:
+            pickle.loads(pickle.dumps(exc))
+        except Exception:
+            raise RuntimeError(repr(exc)) from None
+        raise
+
+
+class Orchestrator:
+    """Executa jobs de exportação de vários sites ao mesmo tempo.
+
+    Os jobs de cada site ficam numa fila própria e são despachados em rodízio entre os sites, respeitando
+    max_workers no total e per_site (ou max_jobs do site) por site, de modo que um site com muitos jobs não
+    atrasa os demais. Com threads, cada site usa uma única EloquaInterface (sessão, descoberta, agendador e
+    métricas compartilhados entre os seus jobs); com processos, cada job cria a sua.
+    A falha de um job é registrada no resultado e não interrompe os outros.
+    """
+
+    def __init__(self,sites,max_workers = 4,per_site = 1,use_processes = False,interface_options = None,on_progress = None):
+        """Construtor do orquestrador
+
+            Parameters
+            ----------
+            sites : list
+                lista de dicionários com site_name, user_name e password, e opcionalmente max_jobs
+                (limite de jobs simultâneos do site, no lugar de per_site)
+            max_workers : int
+                número de jobs executados ao mesmo tempo no total. O padrão é 4
+            per_site : int
+                número de jobs executados ao mesmo tempo em cada site. O padrão é 1
+            use_processes : bool
+                usa um pool de processos em vez de threads. O padrão é False
+            interface_options : dict
+                argumentos extras repassados ao construtor de cada EloquaInterface (pool_size, state_path,
+                dedup_path, ...). Com processos, devem poder ser serializados. O padrão é None
+            on_progress : callable
+                função chamada com um dicionário a cada evento ('started', 'done', 'failed' e, com threads,
+                'rows'), contendo site, activity_type e o progresso agregado. O padrão é None
+
+        """
+        if max_workers < 1 or per_site < 1:
+            raise ValueError("max_workers e per_site devem ser pelo menos 1")
+        self.sites = {}
+        for site in sites:
+            if site["site_name"] in self.sites:
+                raise ValueError("Site repetido: {}".format(site["site_name"]))
+            if site.get("max_jobs",1) < 1:
+                raise ValueError("max_jobs do site {} deve ser pelo menos 1".format(site["site_name"]))
+            self.sites[site["site_name"]] = site
+        self.max_workers = max_workers
+        self.per_site = per_site
+        self.use_processes = use_processes
+        self.interface_options = dict(interface_options or {})
+        self.on_progress = on_progress
+        self._interfaces = {}
+        self._lock = threading.Lock()
+        self._progress = {}
+
+    def _interface(self,site_name):
+        """Método interno que devolve a interface compartilhada de um site (modo com threads)
+        """
+        with self._lock:
+            if site_name not in self._interfaces:
+                site = self.sites[site_name]
+                interface = EloquaInterface(site["site_name"],site["user_name"],site["password"],**self.interface_options)
+                interface.metrics.add_hook(lambda event: self._on_metric(site_name,event))
+                self._interfaces[site_name] = interface
+            return self._interfaces[site_name]
+
+    def _on_metric(self,site_name,event):
+        """Método interno que acumula as linhas baixadas a partir dos eventos de métricas de um site
+        """
+        if event["type"] != "rows" or event["phase"] != "download":
+            return
+        with self._lock:
+            self._progress["rows_downloaded"] += event["rows"]
+        self._notify("rows",site_name,None)
+
+    def _notify(self,kind,site_name,job,**extra):
+        if self.on_progress is not None:
+            self.on_progress(dict(extra,type = kind,site = site_name,activity_type = job["activity_type"] if job else None,
+                                  progress = self.progress()))
+
+    def progress(self):
+        """Método para adquirir o progresso agregado da execução atual
+
+            Returns
+            -------
+            dict
+                total, pending, running, done e failed (em jobs), rows (linhas gravadas pelos jobs concluídos)
+                e rows_downloaded (linhas baixadas até agora, somente com threads)
+        """
+        with self._lock:
+            return dict(self._progress)
+
+    def _limit(self,site_name):
+        return self.sites[site_name].get("max_jobs",self.per_site)
+
+    def _next_site(self,rotation,active):
+        """Método interno que escolhe, em rodízio, o próximo site com jobs pendentes e abaixo do seu limite
+
+            Parameters
+            ----------
+            rotation : collections.deque
+                sites com jobs pendentes, na ordem do rodízio
+            active : dict
+                número de jobs em execução por site
+            Returns
+            -------
+            str
+                nome do site, ou None se nenhum puder receber um job agora
+        """
+        for _ in range(len(rotation)):
+            site_name = rotation[0]
+            rotation.rotate(-1)
+            if active[site_name] < self._limit(site_name):
+                return site_name
+        return None
+
+    def run(self,jobs):
+        """Método para executar os jobs
+
+            Parameters
+            ----------
+            jobs : list
+                lista de dicionários com site, activity_type e path, e opcionalmente extra_filter, workers,
+                resumable e dedup. O path pode conter {site} e {activity_type}, e o formato do arquivo é
+                escolhido pela extensão (.ndjson, .csv, .gz, .zst)
+            Returns
+            -------
+            list
+                um resultado por job, na ordem dos jobs: o job com status ('done' ou 'failed'), seconds e
+                stats (estatísticas da gravação) ou error
+        """
+        queues = {}
+        for index,job in enumerate(jobs):
+            if job["site"] not in self.sites:
+                raise ValueError("Site desconhecido no job: {}".format(job["site"]))
+            if job["activity_type"] not in EloquaInterface.activity_builders:
+                raise ValueError("Tipo de atividade desconhecido: {}".format(job["activity_type"]))
+            queues.setdefault(job["site"],deque()).append((index,job))
+        with self._lock:
+            self._progress = {"total": len(jobs),"pending": len(jobs),"running": 0,"done": 0,"failed": 0,
+                              "rows": 0,"rows_downloaded": 0}
+        results = [None]*len(jobs)
+        rotation = deque(queues)
+        active = {site_name: 0 for site_name in queues}
+        running = {}
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=self.max_workers) as executor:
+            while rotation or running:
+                while len(running) < self.max_workers:
+                    site_name = self._next_site(rotation,active)
+                    if site_name is None:
+                        break
+                    index,job = queues[site_name].popleft()
+                    if not queues[site_name]:
+                        rotation.remove(site_name)
+                    if self.use_processes:
+                        future = executor.submit(_run_job,self.sites[site_name],self.interface_options,job)
+                    else:
+                        future = executor.submit(_export,self._interface(site_name),job)
+                    running[future] = (index,site_name,job,time.monotonic())
+                    active[site_name] += 1
+                    with self._lock:
+                        self._progress["pending"] -= 1
+                        self._progress["running"] += 1
+                    self._notify("started",site_name,job)
+                finished,_ = wait(running,return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index,site_name,job,start = running.pop(future)
+                    active[site_name] -= 1
+                    result = dict(job,seconds = time.monotonic() - start)
+                    try:
+                        result.update(status = "done",stats = future.result())
+                    except Exception as exc:
+                        logging.exception("Falha no job %s de %s",job["activity_type"],site_name)
+                        result.update(status = "failed",error = repr(exc))
+                    results[index] = result
+                    with self._lock:
+                        self._progress["running"] -= 1
+                        self._progress[result["status"]] += 1
+                        if result["status"] == "done":
+                            self._progress["rows"] += result["stats"]["rows"]
+                    self._notify(result["status"],site_name,job)
+        logging.info("Orquestracao concluida: %s",self.progress())
+        return results
+
+    def close(self):
+        """Método para fechar as interfaces criadas para os sites
+        """
+        with self._lock:
+            for interface in self._interfaces.values():
+                interface.close()
+            self._interfaces = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Representação compacta das linhas exportadas. Em vez de um dicionário por linha, com as mesmas chaves
+repetidas milhões de vezes, cada linha vira um registro (tupla nomeada) ou uma tupla simples que compartilha
+um único cabeçalho, e os textos que se repetem entre linhas são guardados uma única vez.
+"""
+
+from collections import namedtuple
+
+
+# campos de baixa cardinalidade cujos valores são compartilhados entre as linhas
+INTERNED_FIELDS = ("ActivityType", "AssetType", "AssetName", "SubjectLine", "CampaignName", "EmailSendType")
+
+# formatos aceitos pelo parâmetro compact
+ROW_FORMATS = ("record", "tuple")
+
+
+def record_type(fields,name = "ActivityRow"):
+    """Função que gera a classe dos registros a partir dos campos da exportação. Os registros são tuplas
+    nomeadas, sem dicionário por instância, que também aceitam acesso pelo nome do campo, como
+    row['ActivityId'] e row.get('ActivityId'), para continuarem compatíveis com o código que usa dicionários
+
+        Parameters
+        ----------
+        fields : list
+            nomes dos campos, na ordem do mapeamento fields da exportação
+        name : str
+            nome da classe gerada. O padrão é 'ActivityRow'
+        Returns
+        -------
+        type
+            classe dos registros
+    """
+    fields = tuple(fields)
+    base = namedtuple(name,fields,rename=True)
+    index = {field: position for position,field in enumerate(fields)}
+    getitem = tuple.__getitem__
+
+    def __getitem__(self,key):
+        if isinstance(key,str):
+            return getitem(self,index[key])
+        return getitem(self,key)
+
+    def get(self,key,default = None):
+        position = index.get(key)
+        return getitem(self,position) if position is not None else default
+
+    def keys(self):
+        return fields
+
+    def items(self):
+        return zip(fields,self)
+
+    def _asdict(self):
+        return dict(zip(fields,self))
+
+    return type(name,(base,),{"__slots__": (),"__getitem__": __getitem__,"get": get,"keys": keys,
+                              "items": items,"_asdict": _asdict,"header": fields})
+
+
+class RowList(list):
+    """Lista de linhas compactas com o cabeçalho compartilhado (atributo header).
+    """
+
+    def __init__(self,rows = (),header = ()):
+        super().__init__(rows)
+        self.header = tuple(header)
+
+
+class RowCompactor:
+    """Converte páginas de dicionários em linhas compactas de um mesmo formato.
+
+    Os valores dos campos em intern_fields passam por uma tabela de textos já vistos, de modo que linhas
+    com o mesmo ActivityType ou CampaignName apontam para o mesmo objeto str. A instância é segura para
+    uso por várias threads.
+    """
+
+    def __init__(self,fields,row_format = "record",intern_fields = INTERNED_FIELDS):
+        """Construtor do conversor
+
+            Parameters
+            ----------
+            fields : list ou dict
+                campos da exportação, na ordem das colunas (o mapeamento fields também é aceito)
+            row_format : str
+                'record' para registros com acesso por atributo e por nome, ou 'tuple' para tuplas simples
+                que compartilham o cabeçalho. O padrão é 'record'
+            intern_fields : tuple
+                campos cujos valores repetidos são compartilhados entre as linhas. O padrão é INTERNED_FIELDS
+
+        """
+        if row_format not in ROW_FORMATS:
+            raise ValueError("Formato de linha desconhecido: {}".format(row_format))
+        self.header = tuple(fields)
+        self.row_format = row_format
+        self.record = record_type(self.header) if row_format == "record" else None
+        self._interned = [position for position,field in enumerate(self.header) if field in set(intern_fields)]
+        self._strings = {}
+
+    def compact_page(self,page):
+        """Método que converte uma página da exportação
+
+            Parameters
+            ----------
+            page : list
+                lista de dicionários, uma página da exportação
+            Returns
+            -------
+            list
+                lista de registros ou de tuplas, na ordem do cabeçalho
+        """
+        header = self.header
+        interned = self._interned
+        # setdefault é atômico no CPython, então a tabela pode ser compartilhada entre threads
+        intern = self._strings.setdefault
+        record = self.record if self.record is not None else tuple
+        new = tuple.__new__
+        rows = []
+        append = rows.append
+        for row in page:
+            values = [row.get(field) for field in header]
+            for position in interned:
+                value = values[position]
+                if value is not None:
+                    values[position] = intern(value,value)
+            append(new(record,values))
+        return rows
+
+    def compact_pages(self,pages):
+        """Gerador que aplica compact_page a cada página, como as de iter_pages
+        """
+        for page in pages:
+            yield self.compact_page(page)
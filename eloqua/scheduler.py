@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Agendador de requisições: limite de taxa (token bucket), limite de concorrência e novas tentativas
+com backoff exponencial para respostas 429/5xx e falhas de conexão.
+"""
+
+import time
+import random
+import logging
+import threading
+import email.utils
+
+import requests
+
+
+class EloquaRequestException(Exception):
+    """Erro http devolvido pelo Eloqua depois de esgotadas as novas tentativas.
+    """
+
+    def __init__(self,status_code,url,body = None):
+        super().__init__("Erro {} na requisição {}: {}".format(status_code,url,body))
+        self.status_code = status_code
+        self.url = url
+        self.body = body
+
+    def __reduce__(self):
+        # permite devolver o erro de um processo do pool, que serializa as exceções com pickle
+        return (self.__class__,(self.status_code,self.url,self.body))
+
+
+class RequestScheduler:
+    """Controla todas as requisições de um site.
+
+    Um token bucket limita a taxa de requisições e um semáforo limita quantas estão em andamento ao mesmo
+    tempo. Respostas 429/5xx e falhas de conexão em GETs são repetidas com backoff exponencial, respeitando
+    o header Retry-After. POSTs só são repetidos em 429, quando o Eloqua recusou a requisição sem processá-la.
+    A mesma instância pode ser compartilhada por várias interfaces do mesmo site.
+    """
+
+    # status http que indicam uma falha temporária
+    retry_statuses = {429, 500, 502, 503, 504}
+
+    def __init__(self,rate = None,burst = None,max_concurrency = 10,max_retries = 5,backoff_base = 1,backoff_max = 60):
+        """Construtor do agendador
+
+            Parameters
+            ----------
+            rate : float
+                requisições por segundo permitidas. O padrão é None (sem limite de taxa)
+            burst : int
+                tamanho do bucket, ou seja, quantas requisições podem sair de uma vez. O padrão é None (igual a rate)
+            max_concurrency : int
+                número máximo de requisições em andamento ao mesmo tempo. O padrão é 10
+            max_retries : int
+                número máximo de novas tentativas por requisição. O padrão é 5
+            backoff_base : float
+                espera, em segundos, antes da primeira nova tentativa; dobra a cada tentativa. O padrão é 1
+            backoff_max : float
+                limite, em segundos, da espera entre tentativas. O padrão é 60
+
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1,rate or 1)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._counters = {"requests": 0,"retries": 0,"throttled": 0,"server_errors": 0,
+                          "connection_errors": 0,"failures": 0,"wait_time": 0.0}
+
+    def reserve(self):
+        """Método que reserva um token do bucket
+
+            Returns
+            -------
+            float
+                tempo, em segundos, que o chamador deve esperar antes de enviar a requisição
+        """
+        if self.rate is None:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,self._tokens + (now - self._last_refill)*self.rate)
+            self._last_refill = now
+            # o token é consumido mesmo que fique negativo; a dívida define a espera de quem reservou
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens/self.rate
+
+    def retry_delay(self,attempt,retry_after = None):
+        """Método que calcula a espera antes de uma nova tentativa
+
+            Parameters
+            ----------
+            attempt : int
+                número da tentativa que falhou, começando em 0
+            retry_after : str
+                valor do header Retry-After, em segundos ou como data http. O padrão é None
+            Returns
+            -------
+            float
+                espera, em segundos
+        """
+        if retry_after:
+            try:
+                return min(self.backoff_max,max(0,float(retry_after)))
+            except ValueError:
+                try:
+                    date = email.utils.parsedate_to_datetime(retry_after)
+                    return min(self.backoff_max,max(0,date.timestamp() - time.time()))
+                except (TypeError, ValueError):
+                    pass
+        delay = min(self.backoff_max,self.backoff_base*(2**attempt))
+        return delay*random.uniform(0.5,1)
+
+    def should_retry(self,method,attempt,status_code = None):
+        """Método que decide se uma requisição que falhou deve ser repetida
+
+            Parameters
+            ----------
+            method : str
+                método http ('get' ou 'post')
+            attempt : int
+                número da tentativa que falhou, começando em 0
+            status_code : int
+                status http da resposta, ou None para uma falha de conexão
+            Returns
+            -------
+            bool
+                True se a requisição deve ser repetida
+        """
+        if attempt >= self.max_retries:
+            return False
+        if status_code is None:
+            return method == 'get'
+        if status_code == 429:
+            return True
+        return method == 'get' and status_code in self.retry_statuses
+
+    def count(self,name,value = 1):
+        """Método para incrementar um contador
+
+            Parameters
+            ----------
+            name : str
+                nome do contador
+            value : float
+                incremento. O padrão é 1
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name,0) + value
+
+    def count_status(self,status_code):
+        """Método para contabilizar uma resposta com falha temporária pelo seu status
+        """
+        self.count("throttled" if status_code == 429 else "server_errors")
+
+    @property
+    def counters(self):
+        """Cópia dos contadores: requests, retries, throttled, server_errors, connection_errors, failures e wait_time
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def run(self,method,url,send,on_retry = None):
+        """Método que executa uma requisição respeitando o limite de taxa e de concorrência, repetindo-a
+        em caso de falha temporária
+
+            Parameters
+            ----------
+            method : str
+                método http ('get' ou 'post')
+            url : str
+                endereço da requisição, usado nos logs e erros
+            send : callable
+                função sem argumentos que envia a requisição e devolve um requests.Response
+            on_retry : callable
+                função chamada com o status http (ou None em falha de conexão) antes de cada nova tentativa
+            Returns
+            -------
+            requests.Response
+                resposta com status de sucesso
+        """
+        attempt = 0
+        while True:
+            wait_time = self.reserve()
+            if wait_time > 0:
+                self.count("wait_time",wait_time)
+                time.sleep(wait_time)
+            response = None
+            with self._semaphore:
+                self.count("requests")
+                try:
+                    response = send()
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                        requests.exceptions.ContentDecodingError) as exc:
+                    # a conexão pode cair no meio do corpo, depois do status já recebido
+                    self.count("connection_errors")
+                    if not self.should_retry(method,attempt):
+                        self.count("failures")
+                        raise
+                    logging.warning("Falha de conexao em %s (tentativa %s): %s",url,attempt+1,exc)
+            if response is not None:
+                if response.status_code < 400:
+                    return response
+                if response.status_code in self.retry_statuses:
+                    self.count_status(response.status_code)
+                if not self.should_retry(method,attempt,response.status_code):
+                    self.count("failures")
+                    body = response.text
+                    response.close()
+                    raise EloquaRequestException(response.status_code,url,body)
+                logging.warning("Status %s em %s (tentativa %s)",response.status_code,url,attempt+1)
+                retry_after = response.headers.get("Retry-After")
+                status_code = response.status_code
+                response.close()
+            else:
+                retry_after = None
+                status_code = None
+            if on_retry is not None:
+                on_retry(status_code)
+            delay = self.retry_delay(attempt,retry_after)
+            self.count("retries")
+            self.count("wait_time",delay)
+            time.sleep(delay)
+            attempt += 1
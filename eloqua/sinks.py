@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Destinos (sinks) para gravar as exportações direto em disco, página a página, com compressão opcional.
+A compressão zstd requer o pacote opcional zstandard.
+"""
+
+import os
+import io
+import csv
+import gzip
+import json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ExportSink:
+    """Classe base dos destinos de exportação.
+
+    As páginas são gravadas num arquivo temporário ao lado do destino, que só é renomeado para o caminho
+    final em close(); se a exportação falhar, abort() apaga o temporário. Usado como gerenciador de contexto,
+    o sink é aberto na entrada, fechado no sucesso e abortado em caso de exceção.
+
+    Para downloads retomáveis, checkpoint() grava em disco tudo o que foi escrito e devolve a posição do arquivo;
+    open(position) reabre o temporário truncado nessa posição. Com compressão, cada checkpoint fecha um membro
+    gzip (ou frame zstd), e a concatenação desses membros continua sendo um arquivo válido.
+    """
+
+    def __init__(self,path,compression = None,tmp_path = None):
+        """Construtor do destino
+
+            Parameters
+            ----------
+            path : str
+                caminho final do arquivo
+            compression : str
+                None, 'gzip' ou 'zstd'. O padrão é None (sem compressão)
+            tmp_path : str
+                caminho do arquivo temporário. O padrão é None (path + pid + .tmp)
+
+        """
+        if compression not in (None,'gzip','zstd'):
+            raise ValueError("Compressão desconhecida: {}".format(compression))
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("A compressão 'zstd' requer o pacote zstandard (pip install zstandard)")
+        self.path = path
+        self.compression = compression
+        self.tmp_path = tmp_path if tmp_path is not None else "{}.{}.tmp".format(path,os.getpid())
+        # linhas gravadas, bytes gravados antes da compressão e tamanho final do arquivo
+        self.rows = 0
+        self.bytes_written = 0
+        self.bytes_on_disk = 0
+        self._raw = None
+        self._file = None
+
+    def open(self,position = None):
+        """Método para abrir o arquivo temporário de escrita
+
+            Parameters
+            ----------
+            position : dict
+                posição devolvida por checkpoint() para continuar uma gravação interrompida. O padrão é None
+        """
+        if position is not None and os.path.exists(self.tmp_path):
+            self._raw = open(self.tmp_path,'r+b')
+            # descarta o que foi escrito depois do último checkpoint
+            self._raw.truncate(position["bytes_on_disk"])
+            self._raw.seek(0,os.SEEK_END)
+            self._restore(position)
+        else:
+            self._raw = open(self.tmp_path,'wb')
+        return self
+
+    def _compressor(self):
+        """Método interno que abre um novo membro/frame de compressão sobre o arquivo temporário
+        """
+        if self.compression == 'gzip':
+            return gzip.GzipFile(fileobj=self._raw,mode='wb')
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor().stream_writer(self._raw,closefd=False)
+        return self._raw
+
+    def _write(self,data):
+        """Método interno para gravar bytes no arquivo, contabilizando-os
+        """
+        if self._raw is None:
+            self.open()
+        if self._file is None:
+            self._file = self._compressor()
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def _finish_member(self):
+        """Método interno que fecha o membro/frame de compressão atual, sem fechar o arquivo
+        """
+        if self._file is not None and self._file is not self._raw:
+            self._file.close()
+        self._file = None
+
+    def _position(self):
+        """Método interno com o estado necessário para continuar a gravação. Subclasses acrescentam o seu
+        """
+        return {"rows": self.rows,"bytes_written": self.bytes_written,"bytes_on_disk": self._raw.tell()}
+
+    def _restore(self,position):
+        """Método interno que restaura o estado salvo por _position
+        """
+        self.rows = position["rows"]
+        self.bytes_written = position["bytes_written"]
+
+    def checkpoint(self):
+        """Método para garantir que tudo o que foi escrito está em disco
+
+            Returns
+            -------
+            dict
+                posição a ser passada para open() ao retomar a gravação
+        """
+        if self._raw is None:
+            self.open()
+        self._finish_member()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        return self._position()
+
+    def write_page(self,page):
+        """Método para gravar uma página da exportação
+
+            Parameters
+            ----------
+            page : list
+                lista de dicionários, uma página da exportação
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Método para finalizar a escrita e mover o arquivo temporário para o caminho final
+
+            Returns
+            -------
+            dict
+                estatísticas da gravação
+        """
+        if self._raw is None:
+            self.open()
+        self._finish_member()
+        self._raw.close()
+        self._raw = None
+        os.replace(self.tmp_path,self.path)
+        self.bytes_on_disk = os.path.getsize(self.path)
+        return self.stats()
+
+    def suspend(self):
+        """Método para interromper a gravação mantendo o arquivo temporário, para retomá-la depois com open(position)
+        """
+        self._file = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def abort(self):
+        """Método para descartar a gravação, apagando o arquivo temporário
+        """
+        self._finish_member()
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def stats(self):
+        """Método para adquirir as estatísticas da gravação
+
+            Returns
+            -------
+            dict
+                dicionário com path, rows, bytes_written e bytes_on_disk
+        """
+        return {"path": self.path,"rows": self.rows,"bytes_written": self.bytes_written,"bytes_on_disk": self.bytes_on_disk}
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class NDJSONSink(ExportSink):
+    """Grava cada linha como um objeto json por linha (NDJSON).
+    """
+
+    def write_page(self,page):
+        """Método para gravar uma página da exportação
+
+            Parameters
+            ----------
+            page : list
+                lista de dicionários, uma página da exportação
+        """
+        if not page:
+            return
+        self._write("".join(json.dumps(row,ensure_ascii=False)+"\n" for row in page).encode('utf-8'))
+        self.rows += len(page)
+
+
+class CSVSink(ExportSink):
+    """Grava as linhas em csv, com cabeçalho.
+    """
+
+    def __init__(self,path,columns = None,compression = None,tmp_path = None):
+        """Construtor do destino csv
+
+            Parameters
+            ----------
+            path : str
+                caminho final do arquivo
+            columns : list
+                colunas do csv, na ordem. O padrão é None (usa as chaves da primeira linha)
+            compression : str
+                None, 'gzip' ou 'zstd'. O padrão é None (sem compressão)
+            tmp_path : str
+                caminho do arquivo temporário. O padrão é None (path + pid + .tmp)
+
+        """
+        super().__init__(path,compression = compression,tmp_path = tmp_path)
+        self.columns = list(columns) if columns is not None else None
+        self._header_written = False
+
+    def write_page(self,page):
+        """Método para gravar uma página da exportação
+
+            Parameters
+            ----------
+            page : list
+                lista de dicionários, uma página da exportação
+        """
+        if not page:
+            return
+        if self.columns is None:
+            self.columns = list(page[0].keys())
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer,fieldnames=self.columns,extrasaction='ignore')
+        if not self._header_written:
+            writer.writeheader()
+            self._header_written = True
+        writer.writerows(page)
+        self._write(buffer.getvalue().encode('utf-8'))
+        self.rows += len(page)
+
+    def _position(self):
+        position = super()._position()
+        position.update({"columns": self.columns,"header_written": self._header_written})
+        return position
+
+    def _restore(self,position):
+        super()._restore(position)
+        self.columns = position["columns"]
+        self._header_written = position["header_written"]
+
+
+def sink_for_path(path,columns = None,tmp_path = None):
+    """Função que escolhe o destino pela extensão do arquivo: .ndjson/.jsonl ou .csv,
+    opcionalmente seguidas de .gz ou .zst
+
+        Parameters
+        ----------
+        path : str
+            caminho final do arquivo
+        columns : list
+            colunas, usadas somente no csv. O padrão é None
+        tmp_path : str
+            caminho do arquivo temporário. O padrão é None (path + pid + .tmp)
+        Returns
+        -------
+        ExportSink
+            destino configurado para o arquivo
+    """
+    name = path.lower()
+    compression = None
+    if name.endswith('.gz'):
+        compression = 'gzip'
+        name = name[:-3]
+    elif name.endswith('.zst'):
+        compression = 'zstd'
+        name = name[:-4]
+    if name.endswith('.csv'):
+        return CSVSink(path,columns = columns,compression = compression,tmp_path = tmp_path)
+    if name.endswith('.ndjson') or name.endswith('.jsonl'):
+        return NDJSONSink(path,compression = compression,tmp_path = tmp_path)
+    raise ValueError("Extensão de arquivo não suportada: {}".format(path))
@@ -13,6 +13,12 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/zearaujo25/OracleEloquaInterface",
     packages=setuptools.find_packages(),
+    extras_require={
+        "async": ["aiohttp"],
+        "columnar": ["numpy", "pyarrow"],
+        "zstd": ["zstandard"],
+        "fast": ["orjson", "ijson"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
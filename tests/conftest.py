@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures compartilhadas dos testes: um MockEloquaServer local e interfaces apontadas para ele.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+from eloqua.eloquainterface import EloquaInterface
+from eloqua.mockserver import MockEloquaServer
+
+
+@pytest.fixture
+def server():
+    with MockEloquaServer(rows = 120,campaigns = 30,sync_duration = 0.05) as mock:
+        yield mock
+
+
+@pytest.fixture
+def make_interface(server):
+    """Fábrica de interfaces apontadas para o servidor local, com polling rápido
+    """
+    interfaces = []
+
+    def make(**options):
+        options.setdefault("poll_initial_delay",0.01)
+        interface = EloquaInterface("mock","user","password",**options)
+        interface.login_url = server.login_url
+        interfaces.append(interface)
+        return interface
+
+    yield make
+    for interface in interfaces:
+        interface.close()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do catálogo de campanhas: índice por nome e atualização incremental.
+"""
+
+from eloqua.campaigns import CampaignCatalog
+
+
+class _Interface:
+    """Interface mínima que devolve, a cada chamada, a próxima lista de campanhas alteradas
+    """
+    site_name = "mock"
+
+    def __init__(self,*batches):
+        self.batches = list(batches)
+
+    def get_campaigns(self,page_size = 1000,workers = 1,updated_since = None):
+        return self.batches.pop(0)
+
+
+def _campaign(campaign_id,name,updated_at):
+    return {"id": str(campaign_id),"name": name,"updatedAt": str(updated_at)}
+
+
+def test_renamed_campaign_hands_its_name_to_the_next_newest():
+    interface = _Interface([_campaign(1,"Newsletter",100),_campaign(2,"Newsletter",300),_campaign(3,"Newsletter",200)],
+                           [_campaign(2,"Newsletter 2021",400)],
+                           [_campaign(3,"Promo",500),_campaign(1,"Promo",600)])
+    catalog = CampaignCatalog(interface)
+    catalog.refresh()
+    assert catalog.by_name("Newsletter")["id"] == "2"
+    catalog.refresh()
+    # as outras campanhas com o nome antigo continuam encontráveis, da mais recente para a mais antiga
+    assert catalog.by_name("Newsletter")["id"] == "3"
+    assert catalog.by_name("Newsletter 2021")["id"] == "2"
+    catalog.refresh()
+    assert catalog.by_name("Newsletter") is None
+    assert catalog.by_name("Promo")["id"] == "1"
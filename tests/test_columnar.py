@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da saída colunar: gravação atômica do arquivo Parquet.
+"""
+
+import os
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from eloqua.columnar import write_parquet
+
+
+def _pages(count,fail_at = None):
+    for number in range(count):
+        if number == fail_at:
+            raise ConnectionError("download interrompido")
+        yield [{"ActivityId": str(number*10+i),"EmailAddress": "a@b.com"} for i in range(10)]
+
+
+def test_write_parquet_replaces_file_on_success(tmp_path):
+    path = str(tmp_path / "click.parquet")
+    assert write_parquet(_pages(3),path) == 30
+    assert pq.read_table(path).num_rows == 30
+    assert os.listdir(tmp_path) == ["click.parquet"]
+
+
+def test_interrupted_write_parquet_leaves_no_file(tmp_path):
+    path = str(tmp_path / "click.parquet")
+    with pytest.raises(ConnectionError):
+        write_parquet(_pages(3,fail_at = 2),path)
+    assert os.listdir(tmp_path) == []
+    # uma gravação anterior completa continua intacta
+    write_parquet(_pages(1),path)
+    with pytest.raises(ConnectionError):
+        write_parquet(_pages(3,fail_at = 1),path)
+    assert pq.read_table(path).num_rows == 10
+    assert os.listdir(tmp_path) == ["click.parquet"]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do formato em disco do índice de deduplicação (eloqua.dedup).
+"""
+
+import os
+from array import array
+
+from eloqua.dedup import ActivityIndex, dedup_pages
+
+
+def _keys(path):
+    keys = array('q')
+    with open(path,'rb') as handle:
+        keys.frombytes(handle.read())
+    return list(keys)
+
+
+def test_commit_merges_sorted_unique_keys(tmp_path):
+    path = str(tmp_path / "click.idx")
+    index = ActivityIndex(path,buffer_size = 3)
+    for value in ["5","1","9","3","7","1","5"]:
+        index.add(value)
+    index.commit()
+    index.add("4")
+    index.add("10")
+    index.commit()
+    index.close()
+    assert _keys(path) == [1,3,4,5,7,9,10]
+
+
+def test_discard_does_not_persist(tmp_path):
+    path = str(tmp_path / "click.idx")
+    index = ActivityIndex(path,buffer_size = 2)
+    index.add("1")
+    index.commit()
+    for value in ["2","3","4"]:
+        index.add(value)
+    index.discard()
+    index.close()
+    assert _keys(path) == [1]
+    reopened = ActivityIndex(path)
+    assert "1" in reopened
+    assert "3" not in reopened
+    reopened.close()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".new")]
+
+
+def test_dedup_pages_across_runs(tmp_path):
+    path = str(tmp_path / "open.idx")
+    pages = [[{"ActivityId": "1"},{"ActivityId": "2"},{"ActivityId": "2"}],[{"ActivityId": "3"}]]
+    index = ActivityIndex(path)
+    assert [len(page) for page in dedup_pages(pages,index)] == [2,1]
+    index.commit()
+    index.close()
+    index = ActivityIndex(path)
+    assert list(dedup_pages(pages + [[{"ActivityId": "4"}]],index)) == [[{"ActivityId": "4"}]]
+    index.close()
+
+
+def test_stale_bloom_filter_is_rebuilt(tmp_path):
+    path = str(tmp_path / "sent.idx")
+    index = ActivityIndex(path,bloom_capacity = 1000)
+    index.add("1")
+    index.commit()
+    index.close()
+    # um commit sem filtro não pode deixar um filtro desatualizado para trás
+    index = ActivityIndex(path)
+    index.add("2")
+    index.commit()
+    index.close()
+    index = ActivityIndex(path,bloom_capacity = 1000)
+    assert not index.add("2")
+    index.commit()
+    index.close()
+    assert _keys(path) == [1,2]
+
+
+def test_instances_sharing_a_path(tmp_path):
+    path = str(tmp_path / "bounce.idx")
+    first = ActivityIndex(path,buffer_size = 2)
+    second = ActivityIndex(path,buffer_size = 2,bloom_capacity = 1000)
+    for value in range(10,15):
+        first.add(value)
+    for value in range(13,18):
+        second.add(value)
+    first.commit()
+    second.commit()
+    first.close()
+    second.close()
+    assert _keys(path) == list(range(10,18))
+
+
+def test_only_abandoned_spills_are_removed(tmp_path):
+    path = str(tmp_path / "click.idx")
+    live = ActivityIndex(path,buffer_size = 1)
+    live.add("1")
+    # um arquivo não confirmado sem dono, como o deixado por um processo que morreu
+    abandoned = path + ".999999.0.new"
+    with open(abandoned,'wb') as handle:
+        handle.write(bytes(8))
+    other = ActivityIndex(path)
+    assert not os.path.exists(abandoned)
+    assert os.path.exists(live._new.path)
+    live.commit()
+    other.close()
+    live.close()
+    assert _keys(path) == [1]
+    # as instâncias fechadas apagam as suas travas; a do arquivo abandonado fica
+    assert [name for name in os.listdir(tmp_path) if ".new" in name] == ["click.idx.999999.0.new.lock"]
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das dependências opcionais: importar a interface não pode carregar numpy nem pyarrow.
+"""
+
+import os
+import sys
+import subprocess
+
+
+def test_interface_import_does_not_load_columnar_dependencies():
+    # roda num processo novo, pois outros testes podem já ter importado numpy
+    code = ("import sys, eloqua.eloquainterface, eloqua.orchestrator, eloqua.campaigns, eloqua.rows, eloqua.dedup; "
+            "print(sorted(name for name in ('numpy','pyarrow') if name in sys.modules))")
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..")
+    output = subprocess.run([sys.executable,"-c",code],cwd = root,capture_output = True,text = True,check = True).stdout
+    assert output.strip() == "[]"
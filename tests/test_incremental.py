@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das exportações incrementais: avanço e persistência da marca d'água.
+"""
+
+import json
+
+
+def test_watermark_advances_and_persists(server,make_interface,tmp_path):
+    state_path = str(tmp_path / "state.json")
+    eloqua = make_interface(state_path = state_path)
+    assert len(eloqua.get_incremental_data("click")) == 120
+    # o servidor devolve as linhas em ordem, uma por segundo a partir de 2020-01-01
+    watermark = {"ActivityDate": "2020-01-01 00:01:59.000","ActivityId": 120}
+    assert eloqua.get_watermark("click") == watermark
+    assert json.load(open(state_path))["mock"]["watermarks"]["click"] == watermark
+
+    # uma nova execução, com o estado lido do disco, não repete as atividades já baixadas
+    eloqua = make_interface(state_path = state_path)
+    assert eloqua.get_incremental_data("click") == []
+    server.rows = 150
+    rows = eloqua.get_incremental_data("click")
+    assert [row["ActivityId"] for row in rows] == [str(i) for i in range(121,151)]
+    assert eloqua.get_watermark("click")["ActivityId"] == 150
+    # cada tipo de atividade tem a sua marca
+    assert eloqua.get_watermark("open") is None
+
+
+def test_watermark_does_not_advance_on_partial_read(make_interface):
+    eloqua = make_interface()
+    rows = eloqua.iter_incremental_data("open")
+    next(rows)
+    rows.close()
+    assert eloqua.get_watermark("open") is None
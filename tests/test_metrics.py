@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das métricas: datas do Eloqua, tempos das sincronizações e tempo de decodificação.
+"""
+
+import datetime
+
+from eloqua.metrics import Metrics, parse_timestamp
+
+
+def test_parse_timestamp_with_seven_digit_fraction():
+    parsed = parse_timestamp("2014-01-01T13:59:07.1375620Z")
+    assert parsed == datetime.datetime(2014,1,1,13,59,7,137562,tzinfo=datetime.timezone.utc)
+    assert parse_timestamp("2014-01-01T13:59:07.5Z").microsecond == 500000
+    assert parse_timestamp("2014-01-01T13:59:07Z").second == 7
+    assert parse_timestamp("not a date") is None
+
+
+def test_sync_times_and_decode_recorded(make_interface):
+    metrics = Metrics()
+    events = []
+    metrics.add_hook(events.append)
+    eloqua = make_interface(metrics = metrics)
+    assert len(eloqua.get_click_data()) == 120
+    sync = metrics.syncs[-1]
+    assert sync["queue_time"] is not None and sync["processing_time"] is not None
+    phases = metrics.snapshot()["phases"]
+    assert phases["download"]["decode_total"] > 0
+    assert any(event["type"] == "decode" and event["phase"] == "download" for event in events)
+    assert "eloqua_decode_seconds_total" in metrics.to_prometheus()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da exportação com checkpoints: retomada depois de uma falha e descarte do checkpoint.
+"""
+
+import json
+
+import pytest
+
+from eloqua.sinks import NDJSONSink
+
+
+class _Crash(Exception):
+    pass
+
+
+def _crash_after(monkeypatch,pages):
+    write_page = NDJSONSink.write_page
+    written = []
+
+    def failing(self,page):
+        if len(written) == pages:
+            raise _Crash()
+        written.append(page)
+        return write_page(self,page)
+
+    monkeypatch.setattr(NDJSONSink,"write_page",failing)
+
+
+def _activity_ids(path):
+    with open(path) as handle:
+        return [json.loads(line)["ActivityId"] for line in handle]
+
+
+def test_resume_reuses_sync_and_completes(server,make_interface,tmp_path,monkeypatch):
+    state_path = str(tmp_path / "state.json")
+    path = str(tmp_path / "click.ndjson")
+    eloqua = make_interface(state_path = state_path)
+    eloqua.page_limit = 50
+    _crash_after(monkeypatch,1)
+    with pytest.raises(_Crash):
+        eloqua.export_activity_resumable("click",path)
+    monkeypatch.undo()
+    checkpoint = json.load(open(state_path))["mock"]["checkpoints"]["click:" + path]
+    assert checkpoint["offset"] == 50
+
+    # uma nova interface, com o estado lido do disco, continua a mesma sincronização
+    syncs = server.request_counts["syncs"]
+    eloqua = make_interface(state_path = state_path)
+    eloqua.page_limit = 50
+    stats = eloqua.export_activity_resumable("click",path)
+    assert server.request_counts["syncs"] == syncs
+    assert stats["rows"] == 120
+    assert _activity_ids(path) == [str(i) for i in range(1,121)]
+    assert json.load(open(state_path))["mock"]["checkpoints"] == {}
+
+
+def test_checkpoint_dropped_when_filter_changes(server,make_interface,tmp_path,monkeypatch):
+    state_path = str(tmp_path / "state.json")
+    path = str(tmp_path / "open.ndjson")
+    eloqua = make_interface(state_path = state_path)
+    eloqua.page_limit = 50
+    _crash_after(monkeypatch,1)
+    with pytest.raises(_Crash):
+        eloqua.export_activity_resumable("open",path,extra_filter = {"ActivityDate": [{"op": ">","value": "2020-01-01"}]})
+    monkeypatch.undo()
+
+    syncs = server.request_counts["syncs"]
+    eloqua.export_activity_resumable("open",path,extra_filter = {"ActivityDate": [{"op": ">","value": "2020-06-01"}]})
+    assert server.request_counts["syncs"] == syncs + 1
+    assert _activity_ids(path) == [str(i) for i in range(1,121)]
+
+
+def test_interfaces_sharing_a_state_file(make_interface,tmp_path):
+    state_path = str(tmp_path / "state.json")
+    first = make_interface(state_path = state_path)
+    second = make_interface(state_path = state_path)
+    first._update_state("checkpoints","a",{"offset": 1})
+    second._update_state("checkpoints","b",{"offset": 2})
+    first._update_state("checkpoints","a",None)
+    assert json.load(open(state_path))["mock"]["checkpoints"] == {"b": {"offset": 2}}
+    assert first._get_state("checkpoints","b") == {"offset": 2}
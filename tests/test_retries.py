@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das novas tentativas do RequestScheduler quando a conexão cai no meio do corpo da resposta.
+"""
+
+import asyncio
+import json
+import socket
+import struct
+import threading
+
+import pytest
+
+from eloqua.eloquainterface import EloquaInterface
+from eloqua.scheduler import RequestScheduler
+
+
+class _DroppingServer:
+    """Servidor http mínimo que derruba a primeira resposta no meio do corpo e responde as seguintes por inteiro
+    """
+
+    def __init__(self,drops = 1):
+        self.drops = drops
+        self.connections = 0
+        self._socket = socket.socket()
+        self._socket.bind(("127.0.0.1",0))
+        self._socket.listen(8)
+        self.url = "http://127.0.0.1:{}/data".format(self._socket.getsockname()[1])
+        self._thread = threading.Thread(target = self._serve,daemon = True)
+        self._thread.start()
+
+    def _serve(self):
+        body = json.dumps({"items": [{"ActivityId": str(i)} for i in range(200)]}).encode()
+        while True:
+            try:
+                connection,_ = self._socket.accept()
+            except OSError:
+                return
+            with connection:
+                connection.recv(65536)
+                self.connections += 1
+                if self.connections <= self.drops:
+                    half = body[:len(body)//2]
+                    connection.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n"
+                                       + "{:x}\r\n".format(len(half)).encode() + half + b"\r\n")
+                    # fecha com RST, como uma conexão derrubada no meio da transferência
+                    connection.setsockopt(socket.SOL_SOCKET,socket.SO_LINGER,struct.pack('ii',1,0))
+                else:
+                    connection.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                                       + "Content-Length: {}\r\n\r\n".format(len(body)).encode() + body)
+
+    def close(self):
+        self._socket.close()
+
+
+@pytest.fixture
+def dropping_server():
+    server = _DroppingServer()
+    yield server
+    server.close()
+
+
+def test_get_retried_after_reset_mid_body(dropping_server):
+    scheduler = RequestScheduler(backoff_base = 0.01)
+    eloqua = EloquaInterface("mock","user","password",scheduler = scheduler)
+    try:
+        response = eloqua.req(dropping_server.url)
+    finally:
+        eloqua.close()
+    assert len(response["items"]) == 200
+    assert dropping_server.connections == 2
+    assert scheduler.counters["retries"] == 1
+    assert scheduler.counters["connection_errors"] == 1
+
+
+def test_async_get_retried_after_reset_mid_body(dropping_server):
+    pytest.importorskip("aiohttp")
+    from eloqua.asynceloquainterface import AsyncEloquaInterface
+
+    async def run():
+        eloqua = AsyncEloquaInterface("mock","user","password",scheduler = RequestScheduler(backoff_base = 0.01))
+        try:
+            return await eloqua.req(dropping_server.url),eloqua.scheduler.counters
+        finally:
+            await eloqua.close()
+
+    response,counters = asyncio.run(run())
+    assert len(response["items"]) == 200
+    assert dropping_server.connections == 2
+    assert counters["retries"] == 1
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da exportação dividida em janelas de tempo (get_sharded_data).
+"""
+
+import datetime
+import threading
+
+import pytest
+
+
+def test_sharded_syncs_bounded_by_workers(make_interface):
+    eloqua = make_interface()
+    lock = threading.Lock()
+    in_flight = [0,0]
+    start_sync = eloqua._start_sync
+    get_data = eloqua.get_data
+
+    def counted_start(*args,**kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        return start_sync(*args,**kwargs)
+
+    def counted_get(*args,**kwargs):
+        try:
+            return get_data(*args,**kwargs)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    eloqua._start_sync = counted_start
+    eloqua.get_data = counted_get
+    # o servidor ignora os filtros: cada janela devolve as mesmas 120 linhas
+    data = eloqua.get_sharded_data("click",datetime.datetime(2020,1,1),datetime.datetime(2020,1,7),workers = 2)
+    assert len(data) == 6*120
+    assert in_flight == [0,2]
+
+
+def test_sharded_download_does_not_poll_again(make_interface):
+    eloqua = make_interface()
+    statuses = []
+    check_data = eloqua.check_data
+
+    def recorded(url,data_uri):
+        response = check_data(url,data_uri)
+        statuses.append((data_uri,response["status"]))
+        return response
+
+    eloqua.check_data = recorded
+    eloqua.get_sharded_data("open",datetime.datetime(2020,1,1),datetime.datetime(2020,1,4),workers = 3)
+    # cada janela vê o status success uma única vez, antes do download
+    successes = [data_uri for data_uri,status in statuses if status == "success"]
+    assert len(successes) == len(set(successes)) == 3
+
+
+@pytest.mark.parametrize("shard_size",[datetime.timedelta(0),datetime.timedelta(days=-1)])
+def test_sharded_rejects_non_positive_shard_size(make_interface,shard_size):
+    eloqua = make_interface()
+    with pytest.raises(ValueError):
+        eloqua.get_sharded_data("click",datetime.datetime(2020,1,1),datetime.datetime(2020,1,2),shard_size = shard_size)